@@ -0,0 +1,88 @@
+"""
+Batch solving of puzzles in the common one-line format:
+81 characters per puzzle, row by row, '.', '0' or 'X' for empty cells.
+Invalid lines (wrong length, unknown symbols) give None like puzzles without solution,
+so one bad line does not stop a run.
+Larger boards are read the same way, see ``SudokuPuzzle.from_line``.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from sudoku import read_lines, solve_status
+
+
+def solve_line(line, engine="search", acceptable_values=None):
+    """
+    Solves one puzzle line
+    :param acceptable_values: defaults to symbols for the board size, see ``default_symbols``
+    :return: solution line, or None if the line is invalid, the puzzle has no solution
+        or the engine did not solve it
+    """
+    status, result = solve_status(line, engine, acceptable_values)
+    # "strategies" may get stuck and return the partial grid
+    return result.to_line() if status == "solved" else None
+
+
+def solve_many(source, engine="search", acceptable_values=None):
+    """
+    Lazily solves puzzles one by one, keeping only the current one in memory.
+    :param source: file name, open file or iterable of puzzle lines
+    :param engine: see ``SudokuPuzzle.solve``
+    :return: generator of solution lines (None for puzzles without solution or not solved by the engine),
+        in input order
+    """
+    for line in read_lines(source):
+        yield solve_line(line, engine, acceptable_values)
+
+
+def solve_chunk(block, engine="search", acceptable_values=None):
+    """
+    Worker side of ``solve_many_parallel``: solves newline separated puzzle lines
+    :return: newline separated solution lines, empty line for puzzles without solution
+    """
+    return "\n".join(solve_line(line, engine, acceptable_values) or "" for line in block.split("\n"))
+
+
+def solve_many_parallel(source, engine="search", workers=None, chunksize=64, ordered=True,
+                        acceptable_values=None):
+    """
+    Solves puzzles in a process pool.
+
+    Lines are sent to workers in chunks of ``chunksize`` joined into a single string,
+    at most two chunks per worker are in flight, so memory stays bounded for any input size.
+    :param workers: number of processes, defaults to number of CPUs
+    :param ordered: yield results in input order; otherwise yield (index, solution) pairs
+        as soon as chunks are done
+    :return: generator of solution lines (None for puzzles without solution)
+    """
+    lines = read_lines(source)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        order = deque()
+        start = 0
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = list(islice(lines, chunksize))
+                if not chunk:
+                    break
+                future = executor.submit(solve_chunk, "\n".join(chunk), engine, acceptable_values)
+                in_flight[future] = start
+                if ordered:
+                    order.append(future)
+                start += len(chunk)
+            if not in_flight:
+                return
+            if ordered:
+                done = [order.popleft()]
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                for i, solution in enumerate(future.result().split("\n")):
+                    if ordered:
+                        yield solution or None
+                    else:
+                        yield index + i, solution or None
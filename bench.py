@@ -0,0 +1,158 @@
+"""
+Benchmark of solver engines over bundled corpora tiered by difficulty.
+
+    python bench.py --json results.json
+    python bench.py --baseline results.json --threshold 0.2
+
+Reports puzzles/sec, p50/p99 latency, solve rate and peak memory for every engine and tier.
+With ``--baseline`` exits with status 1 if any of them got worse than the threshold allows.
+Figures are medians over ``--repeat`` runs after a warm-up run; p99 is only gated for tiers
+large enough for it to differ from the slowest puzzle.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import batch
+from latency import percentile
+from sudoku import SudokuPuzzle, ZeroCandidatesException, NoSolutionException
+
+CORPORA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+TIERS = ("easy", "medium", "hard", "pathological")
+ENGINES = ("strategies", "search", "dlx")
+REPEAT = 5
+# below this many puzzles in a tier p99 is just the slowest one, too noisy to gate on
+MIN_P99_SAMPLES = 100
+
+
+def load_corpus(tier, directory=CORPORA_DIR):
+    return list(batch.read_lines(os.path.join(directory, tier + ".txt")))
+
+
+def run_one(line, engine):
+    """
+    :return: seconds spent, whether the puzzle got solved
+    """
+    start = time.perf_counter()
+    try:
+        solved = SudokuPuzzle.from_line(line).solve(silent=True, engine=engine).is_finished()
+    except (ZeroCandidatesException, NoSolutionException):
+        solved = False
+    return time.perf_counter() - start, solved
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def measure(lines, engine, repeat=REPEAT):
+    """
+    Solves every line once to warm up, then ``repeat`` times, then once more under tracemalloc
+    for peak memory. Speed and latency figures are medians of the figures of every repeat.
+    """
+    for line in lines:
+        run_one(line, engine)
+    figures = []
+    n_solved = 0
+    for _ in range(repeat):
+        latencies = []
+        for line in lines:
+            seconds, solved = run_one(line, engine)
+            latencies.append(seconds)
+            n_solved += solved
+        latencies.sort()
+        figures.append((len(latencies) / sum(latencies), percentile(latencies, 0.5), percentile(latencies, 0.99)))
+    tracemalloc.start()
+    for line in lines:
+        run_one(line, engine)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "puzzles": len(lines),
+        "repeat": repeat,
+        "puzzles_per_sec": median(f[0] for f in figures),
+        "p50_ms": median(f[1] for f in figures) * 1000,
+        "p99_ms": median(f[2] for f in figures) * 1000,
+        "solve_rate": n_solved / (len(lines) * repeat),
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run(engines=ENGINES, tiers=TIERS, repeat=REPEAT, directory=CORPORA_DIR):
+    """
+    :return: dict of metrics by "engine/tier"
+    """
+    results = {}
+    for tier in tiers:
+        lines = load_corpus(tier, directory)
+        for engine in engines:
+            results["{}/{}".format(engine, tier)] = measure(lines, engine, repeat)
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    p99 is compared only for tiers of at least ``MIN_P99_SAMPLES`` puzzles
+    :return: list of regressions of ``results`` against ``baseline``, as text
+    """
+    regressions = []
+    for key, base in sorted(baseline.items()):
+        current = results.get(key)
+        if current is None:
+            continue
+        if current["puzzles_per_sec"] < base["puzzles_per_sec"] * (1 - threshold):
+            regressions.append("{}: puzzles/sec {:.1f} -> {:.1f}".format(
+                key, base["puzzles_per_sec"], current["puzzles_per_sec"]))
+        if current["puzzles"] >= MIN_P99_SAMPLES and current["p99_ms"] > base["p99_ms"] * (1 + threshold):
+            regressions.append("{}: p99 {:.2f} ms -> {:.2f} ms".format(key, base["p99_ms"], current["p99_ms"]))
+        if current["peak_memory_kb"] > base["peak_memory_kb"] * (1 + threshold):
+            regressions.append("{}: peak memory {:.0f} KB -> {:.0f} KB".format(
+                key, base["peak_memory_kb"], current["peak_memory_kb"]))
+        if current["solve_rate"] < base["solve_rate"]:
+            regressions.append("{}: solve rate {:.1%} -> {:.1%}".format(key, base["solve_rate"], current["solve_rate"]))
+    return regressions
+
+
+def format_table(results):
+    lines = ["{:<28} {:>8} {:>12} {:>10} {:>10} {:>8} {:>10}".format(
+        "engine/tier", "puzzles", "puzzles/sec", "p50 ms", "p99 ms", "solved", "peak KB")]
+    for key, r in results.items():
+        lines.append("{:<28} {:>8} {:>12.1f} {:>10.2f} {:>10.2f} {:>8.1%} {:>10.0f}".format(
+            key, r["puzzles"], r["puzzles_per_sec"], r["p50_ms"], r["p99_ms"], r["solve_rate"], r["peak_memory_kb"]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma separated engines")
+    parser.add_argument("--tiers", default=",".join(TIERS), help="comma separated tiers")
+    parser.add_argument("--corpora", default=CORPORA_DIR, help="directory with <tier>.txt files")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="solve every puzzle this many times after a warm-up pass")
+    parser.add_argument("--json", help="save results to this file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.engines.split(","), args.tiers.split(","), args.repeat, args.corpora)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], args.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Solution cache keyed by canonical form of the puzzle.
+
+Puzzles that differ only by relabeled digits, rows or columns permuted within bands/stacks,
+permuted bands/stacks or transposition share one canonical form, so one solve serves all of them.
+
+The canonical form is the lexicographically smallest grid, with digits relabeled in order of
+appearance, over the arrangements allowed by the symmetry group. Arrangements are narrowed
+by colour refinement first: rows, columns and digits get colours from what they see, and
+only orders consistent with the colours are tried. If too many orders stay tied
+(near-empty or very symmetric puzzles), ties are broken by input order: such
+puzzles may miss the cache for an equivalent one, but the answer is always correct.
+"""
+import dbm
+from collections import OrderedDict
+from copy import deepcopy
+from itertools import permutations, product
+from math import factorial
+from time import perf_counter
+from sudoku import SYMBOLS, NoSolutionException, SolveStats, SudokuPuzzle
+
+MAX_ARRANGEMENTS = 64
+
+
+def rank(keys):
+    """
+    Replaces keys by their positions among distinct sorted keys
+    """
+    order = {key: i for i, key in enumerate(sorted(set(keys)))}
+    return [order[key] for key in keys]
+
+
+def refine(grid, size, rounds=2):
+    """
+    Colour refinement of rows, columns and digits of the grid
+    :param grid: list of rows of digit numbers, 0 for empty cells
+    :return: colours of rows, columns, digits (index 0 is unused)
+    """
+    cells = [(r, c, grid[r][c]) for r in range(size) for c in range(size) if grid[r][c]]
+    row_colours = rank([sum(1 for d in row if d) for row in grid])
+    column_colours = rank([sum(1 for row in grid if row[c]) for c in range(size)])
+    digit_colours = rank([sum(1 for _, _, d in cells if d == digit) for digit in range(size + 1)])
+    for _ in range(rounds):
+        row_keys = [[row_colours[r]] for r in range(size)]
+        column_keys = [[column_colours[c]] for c in range(size)]
+        digit_keys = [[digit_colours[d]] for d in range(size + 1)]
+        for r, c, d in cells:
+            row_keys[r].append((column_colours[c], digit_colours[d]))
+            column_keys[c].append((row_colours[r], digit_colours[d]))
+            digit_keys[d].append((row_colours[r], column_colours[c]))
+        row_colours = rank([(key[0], tuple(sorted(key[1:]))) for key in row_keys])
+        column_colours = rank([(key[0], tuple(sorted(key[1:]))) for key in column_keys])
+        digit_colours = rank([(key[0], tuple(sorted(key[1:]))) for key in digit_keys])
+    return row_colours, column_colours, digit_colours
+
+
+def group_orders(colours, box):
+    """
+    Returns line orders consistent with colours: groups of ``box`` lines (bands or stacks)
+    sorted by their colours, lines sorted by colour inside groups.
+    :return: list of choices, every choice is a list of alternative orders of some lines;
+        picking one alternative from every choice and concatenating gives a full order
+    """
+    groups = [sorted(range(g * box, (g + 1) * box), key=colours.__getitem__) for g in range(box)]
+    group_key = [tuple(colours[i] for i in group) for group in groups]
+    choices = []
+    for key in sorted(set(group_key)):
+        tied_groups = [group for group, k in zip(groups, group_key) if k == key]
+        # every line of tied groups may be permuted with lines of the same colour in its group
+        alternatives = []
+        for group_order in permutations(tied_groups):
+            parts = []
+            for group in group_order:
+                runs = []
+                for i in group:
+                    if runs and colours[runs[-1][0]] == colours[i]:
+                        runs[-1].append(i)
+                    else:
+                        runs.append([i])
+                parts.extend(runs)
+            alternatives.append(parts)
+        choices.append(alternatives)
+    return choices
+
+
+def expand(choices):
+    """
+    Enumerates full orders described by ``group_orders``
+    """
+    for picked in product(*choices):
+        runs = [run for parts in picked for run in parts]
+        for run_orders in product(*(permutations(run) for run in runs)):
+            yield [i for run in run_orders for i in run]
+
+
+def count_orders(choices):
+    total = 1
+    for alternatives in choices:
+        per_alternative = 1
+        for run in alternatives[0]:
+            per_alternative *= factorial(len(run))
+        total *= len(alternatives) * per_alternative
+    return total
+
+
+def canonical_form(sudoku, max_arrangements=MAX_ARRANGEMENTS):
+    """
+    Returns canonical form of the puzzle and the transformation leading to it
+    :param max_arrangements: at most this many tied row/column orders are compared
+    :return: canonical line (symbols of ``default_symbols``, '.' for empty cells),
+        transformation (transposed, rows, columns, labels) where canonical cell (i, j) is
+        cell (rows[i], columns[j]) of the puzzle, transposed if ``transposed``,
+        and ``labels`` maps puzzle digit numbers to canonical ones
+    """
+    size = sudoku.size
+    box = sudoku.geometry.box
+    values = [bit.bit_length() for bit in sudoku.values]
+    grid = [values[r * size:(r + 1) * size] for r in range(size)]
+    best = None
+    for transposed in (False, True):
+        if transposed:
+            grid = [list(column) for column in zip(*grid)]
+        row_colours, column_colours, _ = refine(grid, size)
+        row_choices = group_orders(row_colours, box)
+        column_choices = group_orders(column_colours, box)
+        if count_orders(row_choices) * count_orders(column_choices) <= max_arrangements:
+            row_orders = list(expand(row_choices))
+            column_orders = list(expand(column_choices))
+        else:
+            row_orders = [next(expand(row_choices))]
+            column_orders = [next(expand(column_choices))]
+        for rows in row_orders:
+            for columns in column_orders:
+                labels = {}
+                line = bytearray()
+                for r in rows:
+                    row = grid[r]
+                    for c in columns:
+                        d = row[c]
+                        if d:
+                            if d not in labels:
+                                labels[d] = len(labels) + 1
+                            line.append(labels[d])
+                        else:
+                            line.append(0)
+                if best is None or line < best[0]:
+                    best = (line, (transposed, rows, columns, labels))
+    line, transformation = best
+    symbols = "." + SYMBOLS
+    return "".join(symbols[label] for label in line), transformation
+
+
+def restore(sudoku, line, transformation):
+    """
+    Maps a grid in canonical form back to the orientation and digits of the puzzle
+    :param line: grid in canonical form, e.g. solution of the canonical puzzle
+    :return: solved copy of the puzzle
+    """
+    transposed, rows, columns, labels = transformation
+    size = sudoku.size
+    digits = {label: d for d, label in labels.items()}
+    unused = [d for d in range(1, size + 1) if d not in labels]
+    for label in range(1, size + 1):
+        if label not in digits:
+            digits[label] = unused.pop(0)
+    lookup = {symbol: label for label, symbol in enumerate(SYMBOLS[:size], 1)}
+    result = deepcopy(sudoku)
+    for i, r in enumerate(rows):
+        for j, c in enumerate(columns):
+            label = lookup.get(line[i * size + j])
+            k = c * size + r if transposed else r * size + c
+            if label and not result.values[k]:
+                result.place_bit(k, 1 << (digits[label] - 1))
+    return result
+
+
+class SolutionCache:
+    """
+    LRU cache of solutions in front of ``SudokuPuzzle.solve``.
+
+    Solutions are stored in canonical form, so a hit may come from an equivalent puzzle.
+    With ``path`` an on-disk tier (``dbm``) keeps every solution across runs;
+    the in-memory tier keeps ``maxsize`` most recently used ones.
+    ``hits``, ``disk_hits`` and ``misses`` count lookups.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.disk = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    def get_disk(self):
+        if self.disk is None and self.path is not None:
+            self.disk = dbm.open(self.path, "c")
+        return self.disk
+
+    def lookup(self, key):
+        """
+        :return: canonical solution line, "" for puzzles without solution, None if not cached
+        """
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        disk = self.get_disk()
+        if disk is not None and key in disk:
+            self.disk_hits += 1
+            self.store(key, disk[key].decode(), persist=False)
+            return entries[key]
+        self.misses += 1
+        return None
+
+    def store(self, key, solution, persist=True):
+        entries = self.entries
+        entries[key] = solution
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        disk = self.get_disk() if persist else None
+        if disk is not None:
+            disk[key] = solution
+
+    def solve(self, sudoku, engine="search", **kwargs):
+        """
+        Same as ``sudoku.solve``, but looks for the solution of an equivalent puzzle first.
+        Only complete solutions and proofs of no solution are cached; the result has ``status``
+        as ``SudokuPuzzle.solve`` sets it, "solved" for hits.
+        :param kwargs: passed to ``SudokuPuzzle.solve``
+        :raises NoSolutionException: the puzzle has no solution
+        """
+        start = perf_counter()
+        key, transformation = canonical_form(sudoku)
+        solution = self.lookup(key)
+        if solution is None:
+            canonical = SudokuPuzzle.from_line(key)
+            try:
+                solved = canonical.solve(engine=engine, **kwargs)
+            except NoSolutionException:
+                self.store(key, "")
+                raise
+            if not solved.is_finished():
+                result = restore(sudoku, solved.to_line(), transformation)
+                result.stats = solved.stats
+                result.status = solved.status
+                return result
+            solution = solved.to_line()
+            self.store(key, solution)
+            stats = solved.stats
+        else:
+            stats = SolveStats()
+            stats.strategy("cache").calls = 1
+        if not solution:
+            raise NoSolutionException()
+        result = restore(sudoku, solution, transformation)
+        result.stats = stats
+        result.status = "solved"
+        if stats is not None:
+            stats.time = perf_counter() - start
+        return result
+
+    def info(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "size": len(self.entries), "maxsize": self.maxsize}
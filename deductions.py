@@ -0,0 +1,213 @@
+"""
+Deduction strategies working on stored candidates of ``sudoku.SudokuPuzzle``.
+
+Every strategy is a function ``strategy(sudoku, observer=None)`` that removes candidates
+with ``SudokuPuzzle.eliminate`` and returns the number of candidates removed.
+Singles are left to ``sudoku.propagate``; ``sudoku.deduce`` runs propagation and
+the strategies of a pipeline in order, starting over after every strategy that made progress.
+
+``PIPELINE`` is the default order, cheaper and more productive strategies first.
+Any sequence of such functions may be used instead.
+"""
+from functools import lru_cache
+from itertools import combinations
+
+
+def remove(sudoku, k, mask, strategy, observer=None):
+    """
+    Removes candidates of ``mask`` still present in cell k
+    :return: number of candidates removed
+    """
+    mask &= sudoku.candidates[k]
+    if not mask:
+        return 0
+    if observer is not None:
+        observer.elimination(divmod(k, sudoku.size), sudoku.mask_to_values(mask), strategy)
+    sudoku.eliminate(k, mask)
+    return mask.bit_count()
+
+
+@lru_cache(maxsize=None)
+def unit_boards(geometry):
+    """
+    Returns cell bitboards of units: bit k is set for cells k of the unit
+    """
+    return tuple(sum(1 << k for k in unit) for unit in geometry.units)
+
+
+def digit_boards(sudoku):
+    """
+    Returns cell bitboards of digits: bit k of ``boards[i]`` is set if empty cell k has ``symbols[i]`` as a candidate
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    boards = [0] * len(sudoku.symbols)
+    for k in range(len(values)):
+        if not values[k]:
+            mask = candidates[k]
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                boards[bit.bit_length() - 1] |= 1 << k
+    return boards
+
+
+def cells_of(board):
+    """
+    Yields cell numbers of the bitboard
+    """
+    while board:
+        low = board & -board
+        board ^= low
+        yield low.bit_length() - 1
+
+
+def naked_subsets(sudoku, observer=None, max_size=4):
+    """
+    N cells of a unit having only N candidates between them:
+    those candidates are removed from the rest of the unit (pairs, triples, quads)
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    removed = 0
+    for unit in sudoku.geometry.units:
+        cells = [p for p in unit if not values[p]]
+        for n in range(2, min(max_size, len(cells) - 1) + 1):
+            small = [p for p in cells if candidates[p].bit_count() <= n]
+            for subset in combinations(small, n):
+                union = 0
+                for p in subset:
+                    union |= candidates[p]
+                if union.bit_count() != n:
+                    continue
+                for p in cells:
+                    if p not in subset and not values[p]:
+                        removed += remove(sudoku, p, union, "naked_subsets", observer)
+    return removed
+
+
+def hidden_subsets(sudoku, observer=None, max_size=4):
+    """
+    N digits of a unit having only N places between them:
+    other candidates are removed from those cells (pairs, triples, quads)
+    """
+    full_mask = sudoku.full_mask
+    boards = digit_boards(sudoku)
+    removed = 0
+    for unit_board in unit_boards(sudoku.geometry):
+        digits = [(1 << i, board & unit_board) for i, board in enumerate(boards) if board & unit_board]
+        for n in range(2, min(max_size, len(digits) - 1) + 1):
+            few = [(bit, places) for bit, places in digits if places.bit_count() <= n]
+            for subset in combinations(few, n):
+                cells = 0
+                mask = 0
+                for bit, places in subset:
+                    cells |= places
+                    mask |= bit
+                if cells.bit_count() != n:
+                    continue
+                for p in cells_of(cells):
+                    removed += remove(sudoku, p, ~mask & full_mask, "hidden_subsets", observer)
+    return removed
+
+
+@lru_cache(maxsize=None)
+def box_lines(geometry):
+    """
+    Returns (box board, line board) pairs of regions and the rows or columns crossing them
+    """
+    boards = unit_boards(geometry)
+    size = geometry.size
+    regions = range(2 * size, 3 * size)
+    return tuple((boards[b], boards[v]) for b in regions for v in range(2 * size) if boards[b] & boards[v])
+
+
+def locked_candidates(sudoku, observer=None):
+    """
+    Pointing and claiming (box-line reduction): if all places of a digit in a region lie in one row
+    or column, the digit is removed from the rest of the line, and the other way round
+    """
+    removed = 0
+    pairs = box_lines(sudoku.geometry)
+    for i, board in enumerate(digit_boards(sudoku)):
+        bit = 1 << i
+        for box_board, line_board in pairs:
+            if not board & box_board & line_board:
+                continue
+            if not board & box_board & ~line_board:
+                cells = board & line_board & ~box_board
+            elif not board & line_board & ~box_board:
+                cells = board & box_board & ~line_board
+            else:
+                continue
+            for p in cells_of(cells):
+                removed += remove(sudoku, p, bit, "locked_candidates", observer)
+    return removed
+
+
+def fish(sudoku, n, observer=None, strategy="fish"):
+    """
+    Basic fish of size n: a digit having its places in N rows within N columns
+    is removed from the rest of those columns (and the same with rows and columns swapped)
+    """
+    size = sudoku.size
+    boards = unit_boards(sudoku.geometry)
+    removed = 0
+    for i, board in enumerate(digit_boards(sudoku)):
+        bit = 1 << i
+        # positions[line] has bit j set if the digit may be at crossing of the line with j-th crossing line
+        row_positions = [0] * size
+        column_positions = [0] * size
+        for k in cells_of(board):
+            r, c = divmod(k, size)
+            row_positions[r] |= 1 << c
+            column_positions[c] |= 1 << r
+        for positions, base_offset, cover_offset in ((row_positions, 0, size), (column_positions, size, 0)):
+            lines = [(line, mask) for line, mask in enumerate(positions) if 2 <= mask.bit_count() <= n]
+            for subset in combinations(lines, n):
+                covered = 0
+                base = 0
+                for line, mask in subset:
+                    covered |= mask
+                    base |= boards[base_offset + line]
+                if covered.bit_count() != n:
+                    continue
+                for line in cells_of(covered):
+                    for p in cells_of(board & boards[cover_offset + line] & ~base):
+                        removed += remove(sudoku, p, bit, strategy, observer)
+    return removed
+
+
+def x_wing(sudoku, observer=None):
+    return fish(sudoku, 2, observer, "x_wing")
+
+
+def swordfish(sudoku, observer=None):
+    return fish(sudoku, 3, observer, "swordfish")
+
+
+def xy_wing(sudoku, observer=None):
+    """
+    Pivot cell {a, b} sees pincers {a, c} and {b, c}: either pincer is c,
+    so c is removed from cells seeing both pincers
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    peers = sudoku.geometry.peers
+    removed = 0
+    pairs = [k for k in range(len(values)) if not values[k] and candidates[k].bit_count() == 2]
+    for pivot in pairs:
+        mask = candidates[pivot]
+        wings = [p for p in peers[pivot] if not values[p] and candidates[p].bit_count() == 2
+                 and (candidates[p] & mask).bit_count() == 1]
+        for x, y in combinations(wings, 2):
+            c = candidates[x] & candidates[y] & ~mask
+            if not c or (candidates[x] | candidates[y]) & mask != mask or c.bit_count() != 1:
+                continue
+            for p in set(peers[x]).intersection(peers[y]):
+                if p != pivot and not values[p]:
+                    removed += remove(sudoku, p, c, "xy_wing", observer)
+    return removed
+
+
+PIPELINE = (locked_candidates, naked_subsets, hidden_subsets, x_wing, swordfish, xy_wing)
@@ -0,0 +1,182 @@
+"""
+Dancing Links (Knuth's Algorithm X) exact cover solver for sudoku.
+
+Every (cell, digit) pair is a row of the matrix; it covers four columns:
+the cell itself, the digit in its row, the digit in its column and the digit in its region.
+"""
+from copy import deepcopy
+
+
+class ExactCover:
+    """
+    Sparse exact cover matrix stored as circular doubly linked lists in flat arrays.
+
+    Node 0 is the root, nodes 1..n_columns are column headers, the rest are matrix ones.
+    """
+
+    def __init__(self, n_columns):
+        n = n_columns + 1
+        self.left = [i - 1 for i in range(n)]
+        self.right = [i + 1 for i in range(n)]
+        self.left[0] = n_columns
+        self.right[n_columns] = 0
+        self.up = list(range(n))
+        self.down = list(range(n))
+        self.column = list(range(n))
+        self.count = [0] * n
+        self.row_of = [None] * n
+
+    def add_row(self, row_id, columns):
+        """
+        Adds a row having ones in given columns
+        :param row_id: value reported in solutions for this row
+        :param columns: column numbers, 0-based
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        first = None
+        for c in columns:
+            c += 1
+            node = len(left)
+            self.column.append(c)
+            self.row_of.append(row_id)
+            up.append(up[c])
+            down.append(c)
+            down[up[c]] = node
+            up[c] = node
+            self.count[c] += 1
+            if first is None:
+                first = node
+                left.append(node)
+                right.append(node)
+            else:
+                left.append(left[first])
+                right.append(first)
+                right[left[first]] = node
+                left[first] = node
+
+    def cover(self, c):
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def solutions(self, budget=None):
+        """
+        Yields every exact cover as a list of row ids.
+        Column with the fewest ones is chosen first; search runs without recursion.
+        :param budget: ``sudoku.Budget`` charged a node for every column covered by choice
+        """
+        right, down, column, count, row_of = self.right, self.down, self.column, self.count, self.row_of
+        chosen = []
+        forward = True
+        while True:
+            if forward:
+                if right[0] == 0:
+                    yield [row_of[r] for r in chosen]
+                    forward = False
+                    continue
+                c = right[0]
+                best = count[c]
+                j = right[c]
+                while j != 0 and best > 1:
+                    if count[j] < best:
+                        c = j
+                        best = count[j]
+                    j = right[j]
+                if budget is not None:
+                    budget.node()
+                self.cover(c)
+                r = down[c]
+            else:
+                if not chosen:
+                    return
+                r = chosen.pop()
+                c = column[r]
+                j = self.left[r]
+                while j != r:
+                    self.uncover(column[j])
+                    j = self.left[j]
+                r = down[r]
+            if r == c:
+                self.uncover(c)
+                forward = False
+                continue
+            chosen.append(r)
+            j = right[r]
+            while j != r:
+                self.cover(column[j])
+                j = right[j]
+            forward = True
+
+
+def build_matrix(sudoku):
+    """
+    Encodes sudoku as exact cover matrix.
+    Filled cells get only the row of their value, empty cells get rows of their candidates.
+    """
+    size = sudoku.size
+    n_cells = sudoku.geometry.n_cells
+    matrix = ExactCover(4 * n_cells)
+    candidates = sudoku.candidates
+    cell_units = sudoku.geometry.cell_units
+    for k in range(n_cells):
+        mask = candidates[k]
+        row, column, region = cell_units[k]
+        column -= size
+        region -= 2 * size
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            d = bit.bit_length() - 1
+            matrix.add_row((k, bit), (k,
+                                      n_cells + row * size + d,
+                                      2 * n_cells + column * size + d,
+                                      3 * n_cells + region * size + d))
+    return matrix
+
+
+def solutions(sudoku, limit=None, budget=None):
+    """
+    Yields solved copies of the puzzle
+    :param limit: stop after this many solutions
+    :param budget: see ``ExactCover.solutions``
+    """
+    found = 0
+    for rows in build_matrix(sudoku).solutions(budget):
+        solved = deepcopy(sudoku)
+        for k, bit in rows:
+            if not solved.values[k]:
+                solved.place_bit(k, bit)
+        yield solved
+        found += 1
+        if limit is not None and found >= limit:
+            return
+
+
+def solve(sudoku, budget=None):
+    """
+    Returns first solution of the puzzle or None if it has none
+    """
+    return next(solutions(sudoku, limit=1, budget=budget), None)
@@ -0,0 +1,166 @@
+"""
+Generator of uniquely solvable puzzles.
+
+A random solved grid is made by filling the diagonal boxes with shuffled digits and completing
+the rest with ``search``. Clues are then removed one by one in random order; a removal is kept
+if the puzzle stays unique and not harder than the target difficulty.
+
+Uniqueness after removing a clue is checked cheaply: the puzzle was unique before, so another
+solution would have another digit in the freed cell, and only those digits are tried.
+
+Difficulty is the first of ``DIFFICULTIES`` that solves the puzzle:
+"singles" - ``find_single_missing`` alone, "zones" - propagation with zone logic
+(``find_exclude_in_zone``, ``exclude_cells_with_same_possible_values``), "advanced" - ``deduce``
+with ``deductions.PIPELINE`` (subsets, locked candidates, fish, XY-Wing), "nishio" - those with
+``nishio``, "search" - anything harder. Digging seldom produces "search" puzzles, as ``nishio``
+solves almost all of them.
+"""
+import random
+from copy import deepcopy
+from sudoku import (SudokuPuzzle, ZeroCandidatesException, count_solutions, deduce, default_symbols,
+                    propagate, search)
+
+DIFFICULTIES = ("singles", "zones", "advanced", "nishio", "search")
+
+
+def solved_grid(rng, size=9):
+    """
+    Returns random solved SudokuPuzzle
+    """
+    symbols = sorted(default_symbols(size))
+    sudoku = SudokuPuzzle.from_line("." * (size * size))
+    box = sudoku.geometry.box
+    units = sudoku.geometry.units
+    for b in range(box):
+        region = units[2 * size + b * box + b]
+        for k, value in zip(region, rng.sample(symbols, size)):
+            sudoku.place_bit(k, sudoku.bits[value])
+    return search(sudoku)
+
+
+def fill_singles(sudoku):
+    """
+    Places naked singles until there are none, as ``find_single_missing`` does
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    progress = True
+    while progress:
+        progress = False
+        for k in range(len(values)):
+            mask = candidates[k]
+            if not values[k] and not mask & (mask - 1):
+                sudoku.place_bit(k, mask)
+                progress = True
+
+
+def solves(sudoku, difficulty):
+    """
+    Tells if strategies of the difficulty solve the puzzle
+    """
+    if difficulty == "search":
+        return True
+    sudoku = deepcopy(sudoku)
+    try:
+        if difficulty == "singles":
+            fill_singles(sudoku)
+        elif difficulty == "zones":
+            propagate(sudoku)
+        elif difficulty == "advanced":
+            deduce(sudoku)
+        else:
+            sudoku = sudoku.solve(silent=True, stats=False)
+    except ZeroCandidatesException:
+        return False
+    return sudoku.is_finished()
+
+
+def rate(sudoku):
+    """
+    Returns difficulty of the puzzle, see ``DIFFICULTIES``
+    """
+    for difficulty in DIFFICULTIES:
+        if solves(sudoku, difficulty):
+            return difficulty
+
+
+def stays_unique(sudoku, k, value):
+    """
+    Tells if the unique puzzle stays unique when clue ``value`` is removed from empty cell ``k``
+    :param sudoku: the puzzle with cell ``k`` already emptied
+    """
+    sudoku = deepcopy(sudoku)
+    propagate(sudoku)
+    if sudoku.values[k]:
+        return True
+    mask = sudoku.candidates[k] & ~value
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        mark = sudoku.mark()
+        try:
+            sudoku.place_bit(k, bit)
+            if count_solutions(sudoku, limit=1):
+                return False
+        except ZeroCandidatesException:
+            pass
+        sudoku.undo(mark)
+    return True
+
+
+def dig(solution, rng, min_clues, difficulty=None):
+    """
+    Removes clues of the solved grid in random order while the puzzle stays unique,
+    has at least ``min_clues`` clues and is not harder than ``difficulty``
+    :return: puzzle line
+    """
+    line = solution.to_line()
+    cells = list(range(len(line)))
+    rng.shuffle(cells)
+    n_clues = len(line)
+    for k in cells:
+        if n_clues <= min_clues:
+            break
+        candidate = line[:k] + "." + line[k + 1:]
+        sudoku = SudokuPuzzle.from_line(candidate)
+        if not stays_unique(sudoku, k, solution.values[k]):
+            continue
+        if difficulty is not None and not solves(sudoku, difficulty):
+            continue
+        line = candidate
+        n_clues -= 1
+    return line
+
+
+def generate(seed=None, clues=(17, 81), difficulty=None, size=9, max_attempts=100):
+    """
+    Generates uniquely solvable puzzle
+    :param seed: seed of the random generator, same seed gives same puzzle
+    :param clues: (min, max) number of clues
+    :param difficulty: one of ``DIFFICULTIES``, any if None
+    :param max_attempts: number of solved grids to try
+    :return: SudokuPuzzle
+    :raises ValueError: no puzzle matching the parameters was found
+    """
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise ValueError("Unknown difficulty: {}".format(difficulty))
+    rng = random.Random(seed)
+    min_clues, max_clues = clues
+    for _ in range(max_attempts):
+        line = dig(solved_grid(rng, size), rng, min_clues, difficulty)
+        if line.count(".") < size * size - max_clues:
+            continue
+        sudoku = SudokuPuzzle.from_line(line)
+        if difficulty is None or rate(sudoku) == difficulty:
+            return sudoku
+    raise ValueError("No puzzle with {} clues and difficulty {} in {} attempts".format(
+        clues, difficulty, max_attempts))
+
+
+def generate_many(count, seed=None, **kwargs):
+    """
+    Yields ``count`` puzzles, see ``generate`` for arguments
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield generate(rng.getrandbits(64), **kwargs)
@@ -1,5 +1,4 @@
-def table(puzzle):
-    style = """
+STYLE = """
         <style>
             table, td {
                 border:3px solid black;
@@ -12,10 +11,51 @@ def table(puzzle):
             }
         </style>
     """
-    txt = "<table>" +\
-          "".join(["<tr>" +
-                   "".join(["<td>{}</td>".format("" if cell == "X" else cell) for cell in row]) +
-                   "</tr>" for row in puzzle]) + \
-          "</table>"
-    with open("su.html", "w") as file:
-        file.write(style+txt)
+
+
+def render(puzzle):
+    """
+    Returns the grid (list of rows, "X" for empty cells) as an HTML table
+    """
+    return "<table>" +\
+           "".join(["<tr>" +
+                    "".join(["<td>{}</td>".format("" if cell == "X" else cell) for cell in row]) +
+                    "</tr>" for row in puzzle]) + \
+           "</table>"
+
+
+def table(puzzle, path="su.html"):
+    with open(path, "w") as file:
+        file.write(STYLE + render(puzzle))
+
+
+class Document:
+    """
+    HTML document written to an open file one table at a time, for any number of grids
+    """
+
+    def __init__(self, file):
+        self.file = file
+        file.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">" + STYLE + "</head><body>\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, puzzle, caption=""):
+        """
+        :param puzzle: grid to draw, None for a caption alone
+        """
+        if caption:
+            self.file.write("<p>{}</p>\n".format(escape(caption)))
+        if puzzle is not None:
+            self.file.write(render(puzzle) + "\n")
+
+    def close(self):
+        self.file.write("</body></html>\n")
+
+
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
@@ -0,0 +1,12 @@
+"""
+Latency summaries shared by ``bench`` and ``server``.
+"""
+
+
+def percentile(sorted_values, q):
+    """
+    :param sorted_values: non-empty list sorted in ascending order
+    :param q: quantile from 0 to 1
+    :return: the value nearest to the quantile, no interpolation
+    """
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
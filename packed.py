@@ -0,0 +1,226 @@
+"""
+Packed binary format of puzzle corpora.
+
+The file starts with a header:
+
+    magic b"SDKP", version, box size, bits per cell, padding byte,
+    header size (uint32), record size (uint32), symbols joined with "\\0" (UTF-8)
+
+then records of equal size follow, one per grid. Cells are stored row by row with ``bits``
+bits each, 0 for an empty cell, ``i + 1`` for ``symbols[i]``, least significant bits first:
+4 bits per cell and 41 bytes per 9x9 grid, 5 bits and 160 bytes per 16x16 grid.
+
+``PackedReader`` memory-maps the file: records are handed out as memoryview slices
+of the map, and the whole file can be viewed as a numpy array without reading it.
+"""
+import mmap
+import struct
+from itertools import chain
+import batch
+from sudoku import EMPTY, SudokuPuzzle, default_symbols
+
+MAGIC = b"SDKP"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxII")
+# (low, high) nibbles of every byte value
+NIBBLES = tuple((b & 15, b >> 4) for b in range(256))
+
+
+def split_cells(line):
+    """
+    Splits puzzle line into cells as ``SudokuPuzzle.from_line`` does
+    """
+    line = line.strip()
+    return line.split() if any(c.isspace() for c in line) else line
+
+
+def record_size(size):
+    """
+    :return: bits per cell, bytes per record for board of given size
+    """
+    bits = size.bit_length()
+    return bits, (size * size * bits + 7) // 8
+
+
+def pack(numbers, bits):
+    """
+    Packs cell numbers (0 for empty, i + 1 for i-th symbol) into record bytes
+    """
+    if bits == 4:
+        numbers = list(numbers) + [0] * (len(numbers) & 1)
+        return bytes(numbers[i] | numbers[i + 1] << 4 for i in range(0, len(numbers), 2))
+    value = 0
+    for i, number in enumerate(numbers):
+        value |= number << (i * bits)
+    return value.to_bytes((len(numbers) * bits + 7) // 8, "little")
+
+
+def unpack(record, n_cells, bits):
+    """
+    Unpacks record bytes into list of cell numbers
+    """
+    if bits == 4:
+        return list(chain.from_iterable(NIBBLES[b] for b in record))[:n_cells]
+    value = int.from_bytes(record, "little")
+    mask = (1 << bits) - 1
+    return [(value >> (i * bits)) & mask for i in range(n_cells)]
+
+
+class PackedWriter:
+    """
+    Writes grids of one size to a packed file
+    :param acceptable_values: symbols, ``default_symbols`` of the size if None
+    """
+
+    def __init__(self, path, size=9, acceptable_values=None):
+        self.size = size
+        self.symbols = tuple(sorted(acceptable_values or default_symbols(size)))
+        self.lookup = {symbol: i + 1 for i, symbol in enumerate(self.symbols)}
+        self.bits, self.record_size = record_size(size)
+        self.count = 0
+        symbols = "\0".join(self.symbols).encode()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, int(round(size ** 0.5)), self.bits,
+                                    HEADER.size + len(symbols), self.record_size))
+        self.file.write(symbols)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, sudoku):
+        """
+        :param sudoku: SudokuPuzzle or puzzle line, see ``SudokuPuzzle.from_line``;
+            lines are packed as they are, without checking the grid
+        :raises ValueError: wrong number of cells, or a symbol that is neither acceptable nor in ``EMPTY``
+        """
+        if isinstance(sudoku, str):
+            lookup = self.lookup
+            numbers = []
+            for value in split_cells(sudoku):
+                if value in lookup:
+                    numbers.append(lookup[value])
+                elif value in EMPTY:
+                    numbers.append(0)
+                else:
+                    raise ValueError("Unknown symbol {!r} in file of symbols {}".format(value, self.symbols))
+        else:
+            numbers = [bit.bit_length() for bit in sudoku.values]
+        if len(numbers) != self.size * self.size:
+            raise ValueError("Grid of {} cells in file of size {}".format(len(numbers), self.size))
+        self.file.write(pack(numbers, self.bits))
+        self.count += 1
+
+
+class PackedReader:
+    """
+    Memory-mapped packed file; a sequence of records (memoryview, no copies are made).
+    Records must be released before ``close``.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, box, self.bits, self.header_size, self.record_size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a packed puzzle file: {}".format(path))
+        self.size = box * box
+        self.n_cells = self.size * self.size
+        self.symbols = tuple(bytes(self.map[HEADER.size:self.header_size]).decode().split("\0"))
+        self.view = memoryview(self.map)[self.header_size:]
+        self.count = len(self.view) // self.record_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if getattr(self, "view", None) is not None:
+            self.view.release()
+            self.view = None
+        self.map.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not -self.count <= i < self.count:
+            raise IndexError(i)
+        i %= self.count
+        return self.view[i * self.record_size:(i + 1) * self.record_size]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def numbers(self, i):
+        """
+        :return: list of cell numbers of i-th grid, 0 for empty cells
+        """
+        return unpack(self[i], self.n_cells, self.bits)
+
+    def puzzle(self, i):
+        """
+        :return: SudokuPuzzle of i-th grid
+        """
+        return SudokuPuzzle.from_numbers(self.numbers(i), self.symbols)
+
+    def line(self, i, empty="."):
+        symbols = (empty,) + self.symbols
+        separator = " " if len(max(self.symbols, key=len)) > 1 else ""
+        return separator.join(symbols[number] for number in self.numbers(i))
+
+    def array(self):
+        """
+        Returns all grids as (N, size, size) numpy array of cell numbers; requires numpy.
+        The packed bytes are not copied, only unpacked.
+        """
+        import numpy as np
+        packed = np.frombuffer(self.view, dtype=np.uint8).reshape(self.count, self.record_size)
+        if self.bits == 4:
+            cells = np.empty((self.count, self.record_size * 2), dtype=np.int8)
+            cells[:, 0::2] = packed & 15
+            cells[:, 1::2] = packed >> 4
+        else:
+            bits = np.unpackbits(packed, axis=1, bitorder="little")[:, :self.n_cells * self.bits]
+            weights = (1 << np.arange(self.bits)).astype(np.int16)
+            cells = (bits.reshape(self.count, self.n_cells, self.bits) * weights).sum(axis=2).astype(np.int8)
+        return cells[:, :self.n_cells].reshape(self.count, self.size, self.size)
+
+
+def from_text(source, path, size=None, acceptable_values=None):
+    """
+    Converts puzzle lines (file name, open file or iterable, see ``batch.read_lines``) to packed file
+    :param size: board size, taken from the first line if None
+    :param acceptable_values: symbols, ``default_symbols`` of the size (numbers for token lines) if None
+    :return: number of grids written
+    """
+    lines = batch.read_lines(source)
+    first = next(lines, "")
+    cells = split_cells(first)
+    if size is None:
+        size = int(round(len(cells) ** 0.5)) or 9
+    if acceptable_values is None:
+        acceptable_values = default_symbols(size, not isinstance(cells, str))
+    with PackedWriter(path, size, acceptable_values) as writer:
+        for line in chain([first] if first else [], lines):
+            writer.write(line)
+        return writer.count
+
+
+def to_text(path, empty="."):
+    """
+    Yields puzzle lines of packed file
+    """
+    with PackedReader(path) as reader:
+        for i in range(len(reader)):
+            yield reader.line(i, empty)
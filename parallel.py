@@ -0,0 +1,169 @@
+"""
+Parallel search inside one puzzle, for single large or very hard puzzles.
+
+The top of the search tree is expanded in this process, breadth first and with the branching
+of ``search``, until there are a few open subproblems per worker. Alternatives of a branch
+exclude each other, so the subtrees are disjoint: a solution found in one of them is
+a solution of the puzzle, and solution counts of the subtrees add up.
+
+Subproblems go to a process pool as puzzle lines. All workers share one event, checked at every
+search node through ``Budget``: the first solution (or, when counting, the ``limit``-th one)
+sets it, so the other workers stop at their next node and queued subproblems are dropped.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from sudoku import (Budget, LimitReached, NoSolutionException, SudokuPuzzle, ZeroCandidatesException,
+                    count_solutions, pick_branch, propagate, search)
+
+# event shared by the workers of a pool, see ``init_worker``
+cancel_event = None
+
+
+def init_worker(event):
+    global cancel_event
+    cancel_event = event
+
+
+def split(sudoku, n_tasks):
+    """
+    Expands the top of the search tree until there are at least ``n_tasks`` open subproblems
+    or the tree is exhausted. The puzzle itself is not changed.
+    :return: open subproblems (propagated copies), solved grids met on the way
+    """
+    root = deepcopy(sudoku)
+    try:
+        propagate(root, naked_subsets=False)
+    except ZeroCandidatesException:
+        return [], []
+    frontier = deque([root])
+    solved = []
+    while frontier and len(frontier) < n_tasks:
+        node = frontier.popleft()
+        branch = pick_branch(node)
+        if branch is None:
+            solved.append(node)
+            continue
+        for k, bit in branch:
+            child = deepcopy(node)
+            try:
+                child.place_bit(k, bit)
+                propagate(child, naked_subsets=False)
+            except ZeroCandidatesException:
+                continue
+            frontier.append(child)
+    return list(frontier), solved
+
+
+def solve_task(line, acceptable_values, limit, deadline):
+    """
+    Worker side: searches one subproblem
+    :param limit: count solutions up to the limit instead of finding one; 0 for no limit
+    :return: status ("solved", "counted", "no_solution" or a ``Budget`` limit),
+        number of solutions, solution line or None
+    """
+    sudoku = SudokuPuzzle.from_line(line, acceptable_values)
+    budget = Budget(deadline=deadline, cancel=cancel_event)
+    try:
+        if limit is not None:
+            return "counted", count_solutions(sudoku, limit or None, budget), None
+        result = search(sudoku, budget=budget)
+    except LimitReached as x:
+        return x.status, 0, None
+    if result is None:
+        return "no_solution", 0, None
+    return "solved", 1, result.to_line()
+
+
+def run_tasks(sudoku, tasks, limit, workers, deadline):
+    """
+    Runs subproblems in a new pool until a solution or ``limit`` solutions are found
+    :return: solution lines of finished subproblems that found solutions, total count, statuses
+    """
+    context = multiprocessing.get_context()
+    event = context.Event()
+    solutions = []
+    found = 0
+    statuses = set()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(event,)) as executor:
+        futures = [executor.submit(solve_task, task.to_line(), sudoku.acceptable_values, limit, deadline)
+                   for task in tasks]
+        try:
+            for future in as_completed(futures):
+                status, count, line = future.result()
+                statuses.add(status)
+                found += count
+                if line is not None:
+                    solutions.append(line)
+                if found and (limit is None or limit and found >= limit):
+                    break
+        finally:
+            event.set()
+            for future in futures:
+                future.cancel()
+    return solutions, found, statuses
+
+
+def limit_status(statuses):
+    for status in ("timeout", "node_limit", "cancelled"):
+        if status in statuses:
+            return status
+    return None
+
+
+def solve(sudoku, workers=None, tasks_per_worker=4, deadline=None):
+    """
+    Finds a solution with ``workers`` processes; which one is found first is up to the scheduling
+    :param tasks_per_worker: subproblems per worker, more of them balance uneven subtrees better
+    :param deadline: ``time.monotonic()`` value to stop at
+    :return: solved SudokuPuzzle with ``status`` "solved", or a copy of the puzzle with the limit
+        status if the deadline has passed
+    :raises NoSolutionException: the puzzle has no solution
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks, solved = split(sudoku, workers * tasks_per_worker)
+    if solved:
+        result = solved[0]
+    elif tasks:
+        solutions, _, statuses = run_tasks(sudoku, tasks, None, workers, deadline)
+        if not solutions:
+            status = limit_status(statuses)
+            if status is None:
+                raise NoSolutionException()
+            result = deepcopy(sudoku)
+            result.status = status
+            return result
+        result = SudokuPuzzle.from_line(solutions[0], sudoku.acceptable_values)
+    else:
+        raise NoSolutionException()
+    result.status = "solved"
+    return result
+
+
+def count(sudoku, limit=None, workers=None, tasks_per_worker=4, deadline=None):
+    """
+    Counts solutions with ``workers`` processes, see ``sudoku.count_solutions``
+    :param limit: stop all workers when this many solutions are found
+    :return: number of solutions, at most ``limit``
+    :raises LimitReached: the deadline has passed
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks, solved = split(sudoku, workers * tasks_per_worker)
+    found = len(solved)
+    if tasks and (limit is None or found < limit):
+        _, counted, statuses = run_tasks(sudoku, tasks, limit - found if limit else 0, workers, deadline)
+        found += counted
+        status = limit_status(statuses)
+        if status is not None and (limit is None or found < limit):
+            raise LimitReached(status)
+    return found if limit is None else min(found, limit)
+
+
+def is_unique(sudoku, **kwargs):
+    """
+    Tells if the puzzle has exactly one solution; all workers stop at the second one
+    """
+    return count(sudoku, limit=2, **kwargs) == 1
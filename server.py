@@ -0,0 +1,253 @@
+"""
+Asyncio solve server speaking newline delimited JSON over TCP or a Unix socket.
+
+    python server.py --port 8765
+    python server.py --unix /tmp/sudoku.sock
+
+Every request is one JSON object per line, responses come back in completion order
+and carry the request ``id``:
+
+    {"id": 1, "puzzle": "..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3.."}
+    {"id": 1, "solution": "483921657967345821251876493548132976729564138136798245372689514814253769695417382"}
+
+    {"id": 2, "op": "metrics"}
+    {"id": 2, "metrics": {"in_flight": 0, "requests": 1, ...}}
+
+Errors are reported as ``{"id": ..., "error": kind, "message": text}``, where kind is
+"bad_request", "overloaded" (too many requests in flight, retry later), "timeout",
+"no_solution", "unsolved" (the "strategies" engine got stuck, the grid it reached is in
+"partial") or "internal".
+
+Solving runs in a process pool, so the event loop never waits for a hard puzzle.
+Workers get the request deadline and stop at it; a request still counts as in flight
+until its worker is free, so the load is never underestimated.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from latency import percentile
+from sudoku import solve_status
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("search", "dlx", "strategies")
+
+
+def solve_request(line, engine, deadline):
+    """
+    Worker side of a request
+    :param deadline: ``time.monotonic()`` value to give up at
+    :return: status (see ``sudoku.solve_status``), grid line or None
+    """
+    status, result = solve_status(line, engine, deadline=deadline)
+    return status, None if result is None else result.to_line()
+
+
+async def read_request(reader):
+    """
+    Reads one request line; a line over the limit of the reader is skipped to its end
+    :return: the line, b"" at the end of the stream, None for a line that was too long
+    """
+    too_long = False
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+            too_long = True
+            continue
+        return None if too_long else line
+
+
+class SolveServer:
+    """
+    :param workers: number of solver processes, defaults to number of CPUs
+    :param max_in_flight: requests being solved at once; more are rejected as "overloaded"
+    :param timeout: seconds to wait for a solution
+    :param engine: default engine, requests may choose another one of ``ENGINES``
+    :param latency_window: number of recent requests the latency metrics are computed over
+    """
+
+    def __init__(self, workers=None, max_in_flight=64, timeout=10.0, engine="search", latency_window=1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.engine = engine
+        self.executor = None
+        self.server = None
+        self.in_flight = 0
+        self.requests = 0
+        self.results = Counter()
+        self.latencies = deque(maxlen=latency_window)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts listening on TCP; port 0 picks a free port, see ``address``
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info("Listening on %s", self.address)
+        return self
+
+    async def start_unix(self, path):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.server = await asyncio.start_unix_server(self.handle_connection, path)
+        logger.info("Listening on %s", path)
+        return self
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await read_request(reader)
+                if not line:
+                    if line is None:
+                        # answered in order with the others, the connection stays usable
+                        task = asyncio.create_task(self.respond(None, writer, lock))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                        continue
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, asyncio.CancelledError):
+            # a cancelled handler is logged as an error by asyncio streams, so it ends normally
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def respond(self, line, writer, lock):
+        response = await self.handle_request(line)
+        async with lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def handle_request(self, line):
+        """
+        :param line: request line, None for a line over the stream limit
+        :return: response object for one request line
+        """
+        if line is None:
+            return self.error(None, "bad_request", "Request line is too long")
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            return self.error(None, "bad_request", str(e))
+        request_id = request.get("id")
+        if request.get("op", "solve") == "metrics":
+            return {"id": request_id, "metrics": self.metrics()}
+        if request.get("op", "solve") != "solve":
+            return self.error(request_id, "bad_request", "Unknown op: {}".format(request["op"]))
+        puzzle = request.get("puzzle")
+        engine = request.get("engine", self.engine)
+        if not isinstance(puzzle, str) or engine not in ENGINES:
+            return self.error(request_id, "bad_request", "Expected puzzle line and engine one of {}".format(ENGINES))
+        self.requests += 1
+        if self.in_flight >= self.max_in_flight:
+            return self.error(request_id, "overloaded", "{} requests in flight".format(self.in_flight))
+        start = time.perf_counter()
+        self.in_flight += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, solve_request, puzzle, engine,
+                                                            time.monotonic() + self.timeout)
+        future.add_done_callback(self.release)
+        try:
+            # the worker stops at the deadline by itself, waiting is limited in case it is stuck elsewhere
+            status, solution = await asyncio.wait_for(asyncio.shield(future), self.timeout + 1)
+        except asyncio.TimeoutError:
+            return self.error(request_id, "timeout", "No solution in {} s".format(self.timeout))
+        except Exception as e:
+            logger.exception("Solving %r failed", puzzle)
+            return self.error(request_id, "internal", str(e))
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+        if status == "invalid":
+            return self.error(request_id, "bad_request", "Not a puzzle line: {!r}".format(puzzle))
+        if status == "no_solution":
+            return self.error(request_id, "no_solution", "Puzzle has no solution")
+        if status == "timeout":
+            return self.error(request_id, "timeout", "No solution in {} s".format(self.timeout))
+        if status != "solved":
+            response = self.error(request_id, status, "Puzzle is not solved")
+            response["partial"] = solution
+            return response
+        self.results["solved"] += 1
+        return {"id": request_id, "solution": solution}
+
+    def release(self, future):
+        self.in_flight -= 1
+        if not future.cancelled():
+            # retrieve exceptions of requests that timed out, so they are not reported as never retrieved
+            future.exception()
+
+    def error(self, request_id, kind, message):
+        self.results[kind] += 1
+        return {"id": request_id, "error": kind, "message": message}
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "results": dict(self.results),
+            "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        }
+
+
+async def serve(args):
+    server = SolveServer(args.workers, args.max_in_flight, args.timeout, args.engine)
+    if args.unix:
+        await server.start_unix(args.unix)
+    else:
+        await server.start(args.host, args.port)
+    await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="solver processes, number of CPUs by default")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="reject requests above this")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per request")
+    parser.add_argument("--engine", default="search", choices=ENGINES)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
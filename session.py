@@ -0,0 +1,234 @@
+"""
+Interactive solving session.
+
+A ``Session`` keeps the player's grid with its candidates and the solution between moves:
+moves are placed and taken back incrementally with the trail of ``SudokuPuzzle``,
+the solution is found once when the session starts. ``check`` tells whether a move is valid,
+``next_hint`` finds the cheapest deduction in the current grid without solving it again.
+Elimination hints are applied with ``eliminate``, a move like ``play`` that ``undo`` and ``erase``
+take back.
+
+Verdicts of ``check`` and ``play``: "ok", "wrong" (fits the grid but not the solution),
+"conflict" (the digit is already in a unit of the cell), "contradiction" (the digit leaves
+a peer without candidates; not played), "given" or "filled" (the cell is not empty).
+``eliminate`` answers "ok", "wrong" (the solution value is removed), "contradiction"
+(no candidates would be left; not applied), "given" or "filled".
+"""
+from copy import deepcopy
+import deductions
+from sudoku import NoSolutionException, Observer, SudokuPuzzle, ZeroCandidatesException, pick_cell, search
+
+
+class Hint:
+    """
+    One deduction: ``value`` goes to ``cell``, or ``eliminated`` values are removed from its candidates.
+    ``strategy`` is the strategy name, "mistake" for a played value that differs from the solution
+    (``value`` is then the right one) or "solution" if no strategy applies.
+    """
+    __slots__ = ("strategy", "cell", "value", "eliminated")
+
+    def __init__(self, strategy, cell, value=None, eliminated=None):
+        self.strategy = strategy
+        self.cell = cell
+        self.value = value
+        self.eliminated = eliminated
+
+    def __repr__(self):
+        if self.value is None:
+            return "Hint({!r}, {}, eliminated={})".format(self.strategy, self.cell, sorted(self.eliminated))
+        return "Hint({!r}, {}, {!r})".format(self.strategy, self.cell, self.value)
+
+
+class HintFound(Exception):
+    def __init__(self, hint):
+        self.hint = hint
+
+
+class HintObserver(Observer):
+    """
+    Stops a strategy at its first deduction, before the grid is changed
+    """
+
+    def placement(self, cell, value, strategy):
+        raise HintFound(Hint(strategy, cell, value))
+
+    def elimination(self, cell, values, strategy):
+        raise HintFound(Hint(strategy, cell, eliminated=values))
+
+
+class Session:
+    """
+    :param puzzle: SudokuPuzzle or puzzle line
+    :param pipeline: strategies tried by ``next_hint`` after singles, see ``deductions``
+    :raises NoSolutionException: the puzzle has no solution
+    """
+
+    def __init__(self, puzzle, pipeline=deductions.PIPELINE):
+        if isinstance(puzzle, str):
+            puzzle = SudokuPuzzle.from_line(puzzle)
+        self.solution = search(deepcopy(puzzle))
+        if self.solution is None:
+            raise NoSolutionException()
+        self.grid = deepcopy(puzzle)
+        # drop events queued while loading, the session never propagates
+        self.grid.undo(self.grid.mark())
+        self.givens = tuple(bool(bit) for bit in puzzle.values)
+        self.pipeline = pipeline
+        self.moves = []
+
+    def cell_number(self, row, column):
+        size = self.grid.size
+        if not (0 <= row < size and 0 <= column < size):
+            raise ValueError("No cell ({}, {}) on board of size {}".format(row, column, size))
+        return row * size + column
+
+    def bit(self, value):
+        if value not in self.grid.bits:
+            raise ValueError("Not an acceptable value: {!r}".format(value))
+        return self.grid.bits[value]
+
+    def check(self, row, column, value):
+        """
+        Tells whether the value may be played in the cell, without playing it
+        :return: verdict, see module docstring; "contradiction" is only found by ``play``
+        """
+        k = self.cell_number(row, column)
+        bit = self.bit(value)
+        if self.givens[k]:
+            return "given"
+        if self.grid.values[k]:
+            return "filled"
+        if not self.grid.candidates[k] & bit:
+            return "conflict"
+        if bit != self.solution.values[k]:
+            return "wrong"
+        return "ok"
+
+    def play(self, row, column, value):
+        """
+        Places the value if it is "ok" or "wrong"; candidates of peers are updated
+        :return: verdict, see module docstring
+        """
+        verdict = self.check(row, column, value)
+        if verdict in ("ok", "wrong"):
+            k = self.cell_number(row, column)
+            bit = self.bit(value)
+            mark = self.grid.mark()
+            try:
+                self.grid.place_bit(k, bit)
+            except ZeroCandidatesException:
+                self.grid.undo(mark)
+                return "contradiction"
+            self.moves.append((k, bit, mark, False))
+        return verdict
+
+    def eliminate(self, row, column, values):
+        """
+        Removes values from candidates of the cell, e.g. to follow an elimination hint;
+        values that are not candidates are ignored
+        :return: verdict, see module docstring
+        """
+        k = self.cell_number(row, column)
+        mask = 0
+        for value in values:
+            mask |= self.bit(value)
+        if self.givens[k]:
+            return "given"
+        if self.grid.values[k]:
+            return "filled"
+        mask &= self.grid.candidates[k]
+        if mask == self.grid.candidates[k]:
+            return "contradiction"
+        if mask:
+            self.moves.append((k, mask, self.grid.mark(), True))
+            self.grid.eliminate(k, mask)
+        return "wrong" if mask & self.solution.values[k] else "ok"
+
+    def undo(self):
+        """
+        Takes back the last move
+        :return: its cell, None if nothing was played
+        """
+        if not self.moves:
+            return None
+        k, _, mark, _ = self.moves.pop()
+        self.grid.undo(mark)
+        return divmod(k, self.grid.size)
+
+    def erase(self, row, column):
+        """
+        Takes back the digit played in the cell, or all eliminations in it if it was not played;
+        moves made after it are replayed
+        :return: False if there was no move in the cell
+        """
+        k = self.cell_number(row, column)
+        taken = [i for i, (p, _, _, _) in enumerate(self.moves) if p == k]
+        if self.grid.values[k]:
+            # eliminations in a played cell were made before it was played and stay
+            taken = [i for i in taken if not self.moves[i][3]]
+        if not taken:
+            return False
+        later = [move for i, move in enumerate(self.moves) if i > taken[0] and i not in taken]
+        mark = self.moves[taken[0]][2]
+        del self.moves[taken[0]:]
+        self.grid.undo(mark)
+        for p, bits, _, eliminated in later:
+            # a move less leaves more candidates, so replaying cannot fail
+            mark = self.grid.mark()
+            if eliminated:
+                self.grid.eliminate(p, bits)
+            else:
+                self.grid.place_bit(p, bits)
+            self.moves.append((p, bits, mark, eliminated))
+        return True
+
+    def mistakes(self):
+        """
+        Returns played cells whose value differs from the solution
+        and cells where the solution value was eliminated
+        """
+        solution = self.solution.values
+        return [divmod(k, self.grid.size) for k, bits, _, eliminated in self.moves
+                if (bits & solution[k] if eliminated else bits != solution[k])]
+
+    def is_finished(self):
+        return self.grid.is_finished() and not self.mistakes()
+
+    def next_hint(self):
+        """
+        Returns the cheapest deduction in the current grid: a mistake to fix, a naked single,
+        a hidden single, the first deduction of the pipeline strategies, or the solution value
+        of the cell with the fewest candidates. None if the grid is solved.
+        """
+        grid = self.grid
+        size = grid.size
+        symbols = grid.symbols
+        solution = self.solution.values
+        for k, bits, _, eliminated in self.moves:
+            if bits & solution[k] if eliminated else bits != solution[k]:
+                return Hint("mistake", divmod(k, size), symbols[solution[k].bit_length() - 1])
+        if grid.is_finished():
+            return None
+        values = grid.values
+        candidates = grid.candidates
+        for k in range(len(values)):
+            mask = candidates[k]
+            if not values[k] and not mask & (mask - 1):
+                return Hint("find_single_missing", divmod(k, size), symbols[mask.bit_length() - 1])
+        boards = deductions.digit_boards(grid)
+        for unit_board in deductions.unit_boards(grid.geometry):
+            for i, board in enumerate(boards):
+                places = board & unit_board
+                if places and not places & (places - 1):
+                    return Hint("find_exclude_in_zone", divmod(places.bit_length() - 1, size), symbols[i])
+        mark = grid.mark()
+        observer = HintObserver()
+        try:
+            for strategy in self.pipeline:
+                strategy(grid, observer)
+        except HintFound as x:
+            return x.hint
+        finally:
+            grid.undo(mark)
+        k = pick_cell(grid)
+        return Hint("solution", divmod(k, size), symbols[solution[k].bit_length() - 1])
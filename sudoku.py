@@ -1,9 +1,32 @@
-import logging
-import htmltable
+"""
+Sudoku solver working on bitmask candidates.
+
+Imports are kept light, ``python -m sudoku`` is meant to be started many times from shell
+pipelines: ``logging`` is imported when a logger is first needed, ``dlx`` when its engine is used.
+"""
+import deductions
+import os
+from array import array
+from collections import deque
 from copy import deepcopy
-import sample
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(message)s')
+from functools import lru_cache
+from itertools import chain
+from time import monotonic, perf_counter
+
+
+def get_logger():
+    """
+    Returns the module logger, importing ``logging`` on first use
+    """
+    import logging
+    return logging.getLogger(__name__)
+
+
+def __getattr__(name):
+    # the module logger is created lazily, see ``get_logger``
+    if name == "logger":
+        return get_logger()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def str_puzzle(puzzle):
@@ -15,22 +38,21 @@ def str_puzzle(puzzle):
     region_intersection_delim = " + "
     region_vertical_delim = "-"
 
+    box = int(round(len(puzzle) ** 0.5))
+    width = max([5] + [len(x) for row in puzzle for x in row])
     strs = ["Graphical representation:"]
-    fmt_row = region_horizontal_delim.join(["{}"]*3)
-    fmt_interband_row = region_intersection_delim.join(["{}"]*3)
+    fmt_row = region_horizontal_delim.join(["{}"]*box)
+    fmt_interband_row = region_intersection_delim.join(["{}"]*box)
+    sub_row_fmt = cell_horizontal_delim.join(["{:^%d}" % width] * box)
     for i in range(len(puzzle)):
         row = [x if x != "X" else " " for x in puzzle[i]]
-        sub_row_fmt = cell_horizontal_delim.join(["{:^5}"] * 3)
-        strs.append(fmt_row.format(sub_row_fmt.format(*row[0:3]),
-                                   sub_row_fmt.format(*row[3:6]),
-                                   sub_row_fmt.format(*row[6:9])))
+        strs.append(fmt_row.format(*[sub_row_fmt.format(*row[j:j + box]) for j in range(0, len(row), box)]))
         if i != len(puzzle)-1:
-            if i % 3 == 2:
-                sub = region_vertical_delim * 17
-                strs.append(fmt_interband_row.format(sub, sub, sub))
+            if i % box == box - 1:
+                sub = region_vertical_delim * (box * width + (box - 1) * len(cell_horizontal_delim))
             else:
-                sub = cell_intersection_delim.join([cell_vertical_delim*5]*3)
-                strs.append(fmt_row.format(sub, sub, sub))
+                sub = cell_intersection_delim.join([cell_vertical_delim*width]*box)
+            strs.append((fmt_interband_row if i % box == box - 1 else fmt_row).format(*[sub] * box))
     return "\n".join(strs)
 
 
@@ -39,11 +61,497 @@ class ZeroCandidatesException(Exception):
         self.cell = cell
 
 
+class NoSolutionException(Exception):
+    pass
+
+
+class Observer:
+    """
+    Receives solver events. Solvers call it only when it is attached,
+    so without an observer no event is built or formatted.
+    Cells are (row, column) tuples, values are symbols.
+    """
+
+    def placement(self, cell, value, strategy):
+        """
+        Value was put into the cell by the strategy
+        """
+
+    def elimination(self, cell, values, strategy):
+        """
+        Values were removed from candidates of the cell by the strategy
+        """
+
+    def hypothesis(self, cell, value, depth):
+        """
+        Value is supposed to be in the cell; depth is the number of hypotheses made before it
+        """
+
+    def contradiction(self, cell, depth):
+        """
+        Current hypothesis has led to a cell without candidates
+        """
+
+
+class LoggingObserver(Observer):
+    """
+    Writes events to the module logger
+    """
+
+    def __init__(self):
+        self.logger = get_logger()
+
+    def placement(self, cell, value, strategy):
+        self.logger.debug("%s: %s is placed at %s", strategy, value, cell)
+
+    def elimination(self, cell, values, strategy):
+        self.logger.debug("%s: %s removed from %s", strategy, sorted(values), cell)
+
+    def hypothesis(self, cell, value, depth):
+        self.logger.info("%s[*] Suppose cell %s is %s.", "  " * depth, cell, value)
+
+    def contradiction(self, cell, depth):
+        self.logger.info("%s[x] Hypothesis found contradiction at cell %s.", "  " * depth, cell)
+
+
+class StrategyStats:
+    """
+    Counters of one strategy: number of calls, seconds spent, cells placed, candidates eliminated
+    """
+    __slots__ = ("calls", "time", "placed", "eliminated")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.placed = 0
+        self.eliminated = 0
+
+    def as_dict(self):
+        return {"calls": self.calls, "time": self.time, "placed": self.placed, "eliminated": self.eliminated}
+
+
+class SolveStats:
+    """
+    Statistics of one ``SudokuPuzzle.solve`` call, attached to its result as ``stats``.
+
+    ``strategies`` maps strategy name to ``StrategyStats``. Propagation inside ``nishio``
+    hypotheses is counted as ``nishio`` work; in ``search`` it is counted by propagation
+    strategies, including placements undone later, and ``search`` time excludes it.
+    Strategies of a ``deduce`` pipeline are counted under their function names.
+    ``rounds`` counts deduce + nishio rounds, ``nodes``, ``backtracks`` and ``max_depth``
+    describe the search tree.
+    """
+    __slots__ = ("strategies", "time", "rounds", "nodes", "backtracks", "max_depth")
+
+    def __init__(self):
+        self.strategies = {}
+        self.time = 0.0
+        self.rounds = 0
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+
+    def strategy(self, name):
+        if name not in self.strategies:
+            self.strategies[name] = StrategyStats()
+        return self.strategies[name]
+
+    def propagation_time(self):
+        return sum(self.strategy(name).time for name in PROPAGATION_STRATEGIES)
+
+    def deduction_time(self):
+        """
+        Time of all strategies except the engines themselves: propagation and ``deduce`` pipelines
+        """
+        return sum(stats.time for name, stats in self.strategies.items() if name not in ENGINE_STRATEGIES)
+
+    def deduction_placed(self):
+        """
+        Cells placed by all strategies except the engines themselves
+        """
+        return sum(stats.placed for name, stats in self.strategies.items() if name not in ENGINE_STRATEGIES)
+
+    def as_dict(self):
+        return {"time": self.time, "rounds": self.rounds, "nodes": self.nodes, "backtracks": self.backtracks,
+                "max_depth": self.max_depth,
+                "strategies": {name: stats.as_dict() for name, stats in self.strategies.items()}}
+
+
+class LimitReached(Exception):
+    """
+    Raised by ``Budget`` inside solvers; ``status`` tells which limit was hit
+    """
+    def __init__(self, status):
+        self.status = status
+
+
+class Budget:
+    """
+    Limits of one solve, checked cooperatively at every search node, hypothesis and round.
+    :param deadline: ``time.monotonic()`` value to stop at (same clock in all processes)
+    :param timeout: seconds from now, another way to give the deadline
+    :param max_nodes: number of search nodes / hypotheses allowed
+    :param max_rounds: number of propagate + nishio rounds allowed
+    :param cancel: ``threading.Event``, ``multiprocessing.Event`` or any object with ``is_set()``
+    """
+    __slots__ = ("deadline", "max_nodes", "max_rounds", "cancel", "nodes", "rounds")
+
+    def __init__(self, deadline=None, timeout=None, max_nodes=None, max_rounds=None, cancel=None):
+        if timeout is not None:
+            deadline = monotonic() + timeout if deadline is None else min(deadline, monotonic() + timeout)
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        self.max_rounds = max_rounds
+        self.cancel = cancel
+        self.nodes = 0
+        self.rounds = 0
+
+    def node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise LimitReached("node_limit")
+        self.check()
+
+    def round(self):
+        self.rounds += 1
+        if self.max_rounds is not None and self.rounds > self.max_rounds:
+            raise LimitReached("round_limit")
+        self.check()
+
+    def check(self):
+        """
+        :raises LimitReached: deadline has passed or solve was cancelled
+        """
+        if self.deadline is not None and monotonic() >= self.deadline:
+            raise LimitReached("timeout")
+        if self.cancel is not None and self.cancel.is_set():
+            raise LimitReached("cancelled")
+
+
+PROPAGATION_STRATEGIES = ("find_single_missing", "find_exclude_in_zone", "exclude_cells_with_same_possible_values")
+ENGINE_STRATEGIES = ("nishio", "search", "dlx", "cache")
+
+
+class Geometry:
+    """
+    Precomputed cell/unit tables for a board of given size.
+
+    Cells are numbered row by row, ``k = row * size + column``.
+    Units are numbered rows first, then columns, then regions.
+    """
+    __slots__ = ("size", "box", "n_cells", "units", "cell_units", "peers")
+
+    def __init__(self, size):
+        box = int(round(size ** 0.5))
+        if box * box != size:
+            raise ValueError("Board size must be a square of the box size: {}".format(size))
+        self.size = size
+        self.box = box
+        self.n_cells = size * size
+        rows = [tuple(r * size + c for c in range(size)) for r in range(size)]
+        columns = [tuple(r * size + c for r in range(size)) for c in range(size)]
+        regions = [tuple(r * size + c
+                         for r in range(*get_region_indexes(reg_row, box))
+                         for c in range(*get_region_indexes(reg_column, box)))
+                   for reg_row in range(box) for reg_column in range(box)]
+        self.units = tuple(rows + columns + regions)
+        self.cell_units = tuple((k // size, size + k % size, 2 * size + (k // size // box) * box + k % size // box)
+                                for k in range(self.n_cells))
+        self.peers = tuple(tuple(sorted(set(p for u in self.cell_units[k] for p in self.units[u]) - {k}))
+                           for k in range(self.n_cells))
+
+
+@lru_cache(maxsize=None)
+def get_geometry(size):
+    return Geometry(size)
+
+
+@lru_cache(maxsize=None)
+def get_alphabet(symbols):
+    """
+    Returns mapping of sorted symbols to their bits
+    """
+    return {value: 1 << i for i, value in enumerate(symbols)}
+
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# cell markers read as empty cells; any other unknown symbol is an error
+EMPTY = frozenset((".", "0", "X", "_"))
+
+
+@lru_cache(maxsize=None)
+def default_symbols(size, tokens=False):
+    """
+    Returns default acceptable values for a board of given size:
+    '1'-'9' then letters ('123456789ABCDEFG' for 16x16), or numbers '1'..'size'
+    for boards written as whitespace separated tokens
+    """
+    if tokens:
+        return frozenset(str(i) for i in range(1, size + 1))
+    if size > len(SYMBOLS):
+        raise ValueError("No default symbols for size {}, pass acceptable_values".format(size))
+    return frozenset(SYMBOLS[:size])
+
+
 class SudokuPuzzle:
+    """
+    Sudoku grid with stored candidate state.
+
+    ``puzzle`` is the list-of-strings view of the grid; puzzles read with ``from_line`` build it
+    only when it is asked for. Alongside it the puzzle keeps bitmask state: bit ``i`` stands for
+    ``symbols[i]``; ``values[k]`` is the bit of the digit placed in cell ``k`` (0 for empty cells),
+    ``candidates[k]`` is the mask of digits still possible there and ``unit_masks[u]`` is the mask
+    of digits already present in unit ``u``. Use ``place`` to fill cells so that all of them stay
+    in sync.
+
+    Every change of candidates is recorded as an event: the cell goes to ``queue`` and
+    the removed bits are accumulated in ``pending[k]`` until ``propagate`` handles them.
+
+    Every change of the masks is also written to ``trail`` as (array, index, old value),
+    so that hypotheses are tried in place: take ``mark``, change the grid, ``undo`` to the mark.
+    """
+    __slots__ = ("_puzzle", "acceptable_values", "size", "geometry", "symbols", "bits", "full_mask",
+                 "values", "candidates", "unit_masks", "queue", "pending", "trail", "stats", "status")
+
     def __init__(self, puzzle, acceptable_values):
-        self.puzzle = puzzle
+        self.setup(len(puzzle), acceptable_values)
+        self._puzzle = puzzle
+        self.load()
+
+    @classmethod
+    def from_line(cls, line, acceptable_values=None):
+        """
+        Reads puzzle from one line of text, row by row, one character per cell,
+        or one whitespace separated token per cell if the line has whitespace inside
+        (for symbols longer than one character, e.g. '1'..'25').
+        Cells in ``EMPTY`` ('.', '0', 'X', '_') are empty.
+        :param acceptable_values: defaults to ``default_symbols`` of the board size
+        :raises ValueError: not a square grid, or a symbol that is neither acceptable nor in ``EMPTY``
+        """
+        line = line.strip()
+        tokens = line.split() if any(c.isspace() for c in line) else line
+        size = int(round(len(tokens) ** 0.5))
+        if size * size != len(tokens):
+            raise ValueError("Not a square grid: {!r}".format(line))
+        if acceptable_values is None:
+            acceptable_values = default_symbols(size, tokens is not line)
+        sudoku = cls.__new__(cls)
+        sudoku.setup(size, acceptable_values)
+        sudoku._puzzle = None
+        bits = sudoku.bits
+        values = sudoku.values
+        for k, value in enumerate(tokens):
+            bit = bits.get(value)
+            if bit is None:
+                if value not in EMPTY:
+                    raise ValueError("Unknown symbol {!r} in {!r}".format(value, line))
+                bit = 0
+            values[k] = bit
+        sudoku.update_masks()
+        return sudoku
+
+    @classmethod
+    def from_numbers(cls, numbers, acceptable_values):
+        """
+        Builds puzzle from cell numbers, row by row: 0 for an empty cell, ``i + 1`` for
+        ``i``-th of sorted acceptable values
+        """
+        size = int(round(len(numbers) ** 0.5))
+        sudoku = cls.__new__(cls)
+        sudoku.setup(size, acceptable_values)
+        sudoku._puzzle = None
+        values = sudoku.values
+        for k, number in enumerate(numbers):
+            if number:
+                values[k] = 1 << (number - 1)
+        sudoku.update_masks()
+        return sudoku
+
+    def to_line(self, empty="."):
+        """
+        Returns grid as one line of text, see ``from_line``;
+        cells are separated by spaces if some symbol is longer than one character
+        """
+        symbols = self.symbols
+        cells = (symbols[bit.bit_length() - 1] if bit else empty for bit in self.values)
+        return (" " if len(max(symbols, key=len)) > 1 else "").join(cells)
+
+    def setup(self, size, acceptable_values):
+        """
+        :raises ValueError: size is not a square of the box size or does not match acceptable values
+        """
+        if len(acceptable_values) != size:
+            raise ValueError("{} acceptable values for board of size {}".format(len(acceptable_values), size))
         self.acceptable_values = acceptable_values
-        self.size = len(puzzle)
+        self.size = size
+        self.geometry = get_geometry(size)
+        self.symbols = tuple(sorted(acceptable_values))
+        self.bits = get_alphabet(self.symbols)
+        self.full_mask = (1 << len(self.symbols)) - 1
+        self.values = array("L", [0]) * self.geometry.n_cells
+        self.unit_masks = array("L", [0]) * len(self.geometry.units)
+        self.candidates = array("L", [0]) * self.geometry.n_cells
+        self.pending = array("L", [0]) * self.geometry.n_cells
+        self.queue = deque()
+        self.trail = []
+        self.stats = None
+        self.status = None
+
+    @property
+    def puzzle(self):
+        if self._puzzle is None:
+            symbols = self.symbols
+            size = self.size
+            cells = [symbols[bit.bit_length() - 1] if bit else "X" for bit in self.values]
+            self._puzzle = [cells[i:i + size] for i in range(0, len(cells), size)]
+        return self._puzzle
+
+    def load(self):
+        """
+        (Re)builds bitmask state from the ``puzzle`` view
+        """
+        bits = self.bits
+        values = self.values
+        k = 0
+        for row in self._puzzle:
+            for value in row:
+                values[k] = bits.get(value, 0)
+                k += 1
+        self.update_masks()
+
+    def update_masks(self):
+        """
+        Rebuilds unit and candidate masks from ``values`` and queues every cell
+        that has lost candidates, so the next ``propagate`` looks at all of them
+        :raises ZeroCandidatesException: same value is given twice in a unit
+        """
+        cell_units = self.geometry.cell_units
+        values = self.values
+        unit_masks = self.unit_masks
+        for u in range(len(unit_masks)):
+            unit_masks[u] = 0
+        for k in range(len(values)):
+            bit = values[k]
+            if bit:
+                for u in cell_units[k]:
+                    if unit_masks[u] & bit:
+                        raise ZeroCandidatesException(divmod(k, self.size))
+                    unit_masks[u] |= bit
+        candidates = self.candidates
+        pending = self.pending
+        full_mask = self.full_mask
+        self.queue.clear()
+        self.trail.clear()
+        for k in range(len(values)):
+            pending[k] = 0
+            if values[k]:
+                candidates[k] = values[k]
+            else:
+                r, c, reg = cell_units[k]
+                candidates[k] = full_mask & ~(unit_masks[r] | unit_masks[c] | unit_masks[reg])
+                if candidates[k] != full_mask:
+                    pending[k] = full_mask & ~candidates[k]
+                    self.queue.append(k)
+
+    def mask_to_values(self, mask):
+        """
+        Converts candidate bitmask to set of values
+        """
+        result = set()
+        symbols = self.symbols
+        while mask:
+            low = mask & -mask
+            result.add(symbols[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    def get_candidates_mask(self, row, column):
+        return self.candidates[row * self.size + column]
+
+    def get_candidates(self, row, column):
+        """
+        Returns values still possible in the cell
+        :param row: row number, 0-based
+        :param column: column number, 0-based
+        :return: set of values
+        """
+        return self.mask_to_values(self.candidates[row * self.size + column])
+
+    def place(self, row, column, value):
+        """
+        Puts value into the cell and removes it from candidates of all peers
+        :raises ZeroCandidatesException: value is not a candidate here, or a peer ran out of candidates
+        """
+        self.place_bit(row * self.size + column, self.bits[value])
+
+    def place_bit(self, k, bit):
+        """
+        Same as ``place``, addressed by cell number and value bit
+        :return: number of candidates eliminated from peers
+        """
+        candidates = self.candidates
+        values = self.values
+        if values[k] or not candidates[k] & bit:
+            raise ZeroCandidatesException(divmod(k, self.size))
+        if self._puzzle is not None:
+            row, column = divmod(k, self.size)
+            self._puzzle[row][column] = self.symbols[bit.bit_length() - 1]
+        trail = self.trail
+        trail.append((values, k, 0))
+        trail.append((candidates, k, candidates[k]))
+        values[k] = bit
+        removed = candidates[k] & ~bit
+        candidates[k] = bit
+        if removed:
+            # other digits lost a place in units of the cell
+            if not self.pending[k]:
+                self.queue.append(k)
+            self.pending[k] |= removed
+        unit_masks = self.unit_masks
+        for u in self.geometry.cell_units[k]:
+            trail.append((unit_masks, u, unit_masks[u]))
+            unit_masks[u] |= bit
+        eliminated = 0
+        for p in self.geometry.peers[k]:
+            if candidates[p] & bit and not values[p]:
+                self.eliminate(p, bit)
+                eliminated += 1
+        return eliminated
+
+    def eliminate(self, k, bit):
+        """
+        Removes candidate bit from cell k
+        :raises ZeroCandidatesException: cell has no candidates left
+        """
+        old = self.candidates[k]
+        self.trail.append((self.candidates, k, old))
+        mask = old & ~bit
+        self.candidates[k] = mask
+        if not mask:
+            raise ZeroCandidatesException(divmod(k, self.size))
+        if not self.pending[k]:
+            self.queue.append(k)
+        self.pending[k] |= bit
+
+    def mark(self):
+        """
+        Returns current position in the trail, see ``undo``
+        """
+        return len(self.trail)
+
+    def undo(self, mark):
+        """
+        Rolls back all changes made after the ``mark``; queued events are dropped
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            arr, i, old = trail.pop()
+            arr[i] = old
+        pending = self.pending
+        for k in self.queue:
+            pending[k] = 0
+        self.queue.clear()
+        self._puzzle = None
 
     def get_row(self, row):
         """
@@ -62,22 +570,24 @@ class SudokuPuzzle:
         return [row[column] for row in self.puzzle]
 
     def get_region(self, reg_row, reg_column):
-        row_section = get_region_indexes(reg_row, 3)
-        col_section = get_region_indexes(reg_column, 3)
+        box = self.geometry.box
+        row_section = get_region_indexes(reg_row, box)
+        col_section = get_region_indexes(reg_column, box)
         region = [item for row in self.puzzle[slice(*row_section)] for item in row[slice(*col_section)]]
         return region
 
     def get_region_by_rc(self, row, column):
-        row_section = get_section(row)
-        col_section = get_section(column)
+        row_section = get_section(row, self.geometry.box)
+        col_section = get_section(column, self.geometry.box)
         region = [item for row in self.puzzle[slice(*row_section)] for item in row[slice(*col_section)]]
         return region
 
     def get_empty_cells(self):
-        for i_row in range(len(self.puzzle)):
-            for j_cell in range(len(self.puzzle[i_row])):
-                if self.puzzle[i_row][j_cell] not in self.acceptable_values:
-                    yield i_row, j_cell
+        size = self.size
+        values = self.values
+        for k in range(len(values)):
+            if not values[k]:
+                yield divmod(k, size)
 
     def __str__(self):
         return str_puzzle(self.puzzle)
@@ -86,57 +596,156 @@ class SudokuPuzzle:
         return self.__deepcopy__()
 
     def __deepcopy__(self, memodict={}):
-        return SudokuPuzzle(
-            deepcopy(self.puzzle),
-            deepcopy(self.acceptable_values)
-        )
+        clone = SudokuPuzzle.__new__(SudokuPuzzle)
+        clone._puzzle = None if self._puzzle is None else [list(row) for row in self._puzzle]
+        clone.acceptable_values = self.acceptable_values
+        clone.size = self.size
+        clone.geometry = self.geometry
+        clone.symbols = self.symbols
+        clone.bits = self.bits
+        clone.full_mask = self.full_mask
+        clone.values = array("L", self.values)
+        clone.candidates = array("L", self.candidates)
+        clone.unit_masks = array("L", self.unit_masks)
+        clone.pending = array("L", self.pending)
+        clone.queue = deque(self.queue)
+        clone.trail = []
+        clone.stats = None
+        clone.status = None
+        return clone
 
     def __eq__(self, other):
-        return self.puzzle == other.puzzle
+        return self.values == other.values
 
     def is_finished(self):
-        return len(list(self.get_empty_cells())) == 0
-
-    def solve(self, silent=False, enable_desperate=True):
-        c_puzzle = deepcopy(self)
-        rounds = 0
-        while True:
-            if c_puzzle.is_finished():
-                return c_puzzle
-            rounds += 1
-            if not silent:
-                logging.info("{}\n\nround #{}".format("="*80,  rounds))
-            new_puzzle = deepcopy(c_puzzle)
-            if not silent:
-                logging.info("Running strategy: find_single_missing")
-            find_single_missing(new_puzzle, silent, draw_probable_values=False)
-            if not silent:
-                logging.info("Running strategy: run_find_cell_candidates")
-            run_find_cell_candidates(new_puzzle, silent)
-            if c_puzzle == new_puzzle:
-                if enable_desperate:
-                    if not silent:
-                        logging.info("[despair mode]: Running strategy: nishio")
-                    new_puzzle = nishio(new_puzzle, silent)
-                    if c_puzzle == new_puzzle:
-                        return new_puzzle
-                else:
-                    return new_puzzle
-            c_puzzle = new_puzzle
+        return 0 not in self.values
+
+    def count_solutions(self, limit=None):
+        """
+        Counts solutions of the puzzle, see ``count_solutions``
+        """
+        return count_solutions(deepcopy(self), limit)
+
+    def is_unique(self):
+        """
+        Tells if the puzzle has exactly one solution; stops at the second one
+        """
+        return self.count_solutions(limit=2) == 1
+
+    def solve(self, silent=False, enable_desperate=True, engine="strategies", observer=None, stats=True,
+              deadline=None, timeout=None, max_nodes=None, max_rounds=None, cancel=None, pipeline=None):
+        """
+        Solves the puzzle, returns new SudokuPuzzle with ``SolveStats`` in its ``stats``
+        and the outcome in its ``status``: "solved", "unsolved" (strategies are stuck) or,
+        when a limit was hit, "timeout", "node_limit", "round_limit" or "cancelled".
+        On a limit the best grid known for sure is returned: everything deduced before
+        the current hypotheses, with its candidates.
+        The puzzle is copied once, engines then work on the copy in place.
+        :param silent: do not log; without it and without ``observer`` a ``LoggingObserver`` is used
+        :param observer: ``Observer`` receiving solver events
+        :param stats: collect ``SolveStats``; counting and timing strategies costs a few percent
+        :param engine: "strategies" runs propagation and falls back to ``nishio`` if ``enable_desperate``
+            (may return a partially filled grid); "search" runs complete depth-first ``search``;
+            "dlx" solves the exact cover encoding with Dancing Links
+        :param deadline: ``time.monotonic()`` value to stop at, see ``Budget`` for this and other limits
+        :param timeout: seconds to stop after
+        :param max_nodes: search nodes / hypotheses allowed
+        :param max_rounds: propagate + nishio rounds allowed
+        :param cancel: event to stop at when it is set
+        :param pipeline: strategies run after propagation, see ``deduce``; None for the engine default:
+            ``deductions.PIPELINE`` for "strategies", nothing for "search" (at every node it costs
+            more than the branches it saves), unused by "dlx"
+        :raises ZeroCandidatesException: strategies found a contradiction
+        :raises NoSolutionException: search or dlx proved that the puzzle has no solution
+        """
+        if observer is None and not silent:
+            observer = LoggingObserver()
+        solve_stats = SolveStats() if stats else None
+        budget = None
+        if deadline is not None or timeout is not None or max_nodes is not None or max_rounds is not None \
+                or cancel is not None:
+            budget = Budget(deadline, timeout, max_nodes, max_rounds, cancel)
+        status = None
+        start = perf_counter()
+        if engine == "search":
+            result = deepcopy(self)
+            try:
+                result = search(result, observer, stats=solve_stats, budget=budget, pipeline=pipeline)
+            except LimitReached as x:
+                status = x.status
+            if stats:
+                solve_stats.rounds = 1
+                engine_stats = solve_stats.strategy("search")
+                engine_stats.calls = solve_stats.nodes
+                engine_stats.time = perf_counter() - start - solve_stats.deduction_time()
+        elif engine == "dlx":
+            import dlx
+            try:
+                result = dlx.solve(self, budget)
+            except LimitReached as x:
+                result = deepcopy(self)
+                status = x.status
+            if stats:
+                solve_stats.rounds = 1
+                engine_stats = solve_stats.strategy("dlx")
+                engine_stats.calls = 1
+                engine_stats.time = perf_counter() - start
+                if result is not None and status is None:
+                    engine_stats.placed = self.values.count(0)
+        elif engine == "strategies":
+            if pipeline is None:
+                pipeline = deductions.PIPELINE
+            result = deepcopy(self)
+            try:
+                while True:
+                    if budget is not None:
+                        budget.round()
+                    if stats:
+                        solve_stats.rounds += 1
+                    deduce(result, pipeline, observer, solve_stats)
+                    if result.is_finished() or not enable_desperate:
+                        break
+                    if stats:
+                        nishio_start = perf_counter()
+                        deduction_time = solve_stats.deduction_time()
+                        deduction_placed = solve_stats.deduction_placed()
+                        n_left = result.values.count(0)
+                    progress = nishio(result, observer, solve_stats, budget)
+                    if stats:
+                        nishio_stats = solve_stats.strategy("nishio")
+                        nishio_stats.calls += 1
+                        # cells placed by propagation after the nishio placement are counted there
+                        nishio_stats.placed += (n_left - result.values.count(0)
+                                                - (solve_stats.deduction_placed() - deduction_placed))
+                        nishio_stats.time += (perf_counter() - nishio_start
+                                              - (solve_stats.deduction_time() - deduction_time))
+                    if progress is None:
+                        break
+            except LimitReached as x:
+                status = x.status
+        else:
+            raise ValueError("Unknown engine: {}".format(engine))
+        if result is None:
+            raise NoSolutionException()
+        if stats:
+            solve_stats.time = perf_counter() - start
+        result.stats = solve_stats
+        result.status = status or ("solved" if result.is_finished() else "unsolved")
+        return result
 
 
 def get_region_indexes(region_number, region_size):
     return region_number*region_size, (region_number+1)*region_size
 
 
-def get_region_cells(reg_row, reg_column):
-    row_section = get_region_indexes(reg_row, 3)
-    col_section = get_region_indexes(reg_column, 3)
+def get_region_cells(reg_row, reg_column, region_size=3):
+    row_section = get_region_indexes(reg_row, region_size)
+    col_section = get_region_indexes(reg_column, region_size)
     cells = [(i, j) for i in range(*row_section) for j in range(*col_section)]
     return cells
 
 
-def get_section(i):
+def get_section(i, region_size=3):
     """
     get section indexes for current index
 
@@ -146,10 +755,11 @@ def get_section(i):
     3 -> (3,6)
 
     :param i:
+    :param region_size: box size, 3 for 9x9 boards, 4 for 16x16
     :return:
     """
-    section = i // 3
-    return get_region_indexes(section, 3)
+    section = i // region_size
+    return get_region_indexes(section, region_size)
 
 
 def get_missing(lst: set, acceptable_values: set) -> set:
@@ -170,11 +780,7 @@ def generate_scratch(sudoku, length, acceptable_values):
 
 
 def get_possibles_for_cell(sudoku, i, j):
-    missing_row = get_missing(set(sudoku.get_row(i)), sudoku.acceptable_values)
-    missing_col = get_missing(set(sudoku.get_column(j)), sudoku.acceptable_values)
-    missing_region = get_missing(set(sudoku.get_region_by_rc(i, j)), sudoku.acceptable_values)
-    acceptable_here = missing_col & missing_row & missing_region
-    return acceptable_here
+    return sudoku.get_candidates(i, j)
 
 ########################################################################################################################
 # methods
@@ -187,28 +793,28 @@ def find_single_missing(sudoku, silent=False, draw_probable_values=True):
     """
     length = 5
     candidates_changed = False
-    candidates = generate_scratch(sudoku, length, sudoku.acceptable_values)
+    candidates = None if silent else generate_scratch(sudoku, length, sudoku.acceptable_values)
     for cell in sudoku.get_empty_cells():
         i, j = cell
-        acceptable_here = get_possibles_for_cell(sudoku, i, j)
-        if not acceptable_here:
+        mask = sudoku.get_candidates_mask(i, j)
+        n_candidates = mask.bit_count()
+        if not n_candidates:
             raise ZeroCandidatesException(cell)
-        elif len(acceptable_here) == 1:
-            (value, *rest) = acceptable_here
-            candidates[i][j] = "{:^{}}".format(" >{}< ".format(value), length)
+        elif n_candidates == 1:
+            value = sudoku.symbols[mask.bit_length() - 1]
+            if not silent:
+                candidates[i][j] = "{:^{}}".format(" >{}< ".format(value), length)
             candidates_changed = True
-            sudoku.puzzle[i][j] = value
-        elif len(acceptable_here) == 2:
-            # pass
-            l_acc = list(acceptable_here)
-            if draw_probable_values:
-                candidates[i][j] = "{:^{}}".format("[{},{}]".format(*l_acc), length)
+            sudoku.place(i, j, value)
+        elif n_candidates == 2:
+            if draw_probable_values and not silent:
+                candidates[i][j] = "{:^{}}".format("[{},{}]".format(*sudoku.mask_to_values(mask)), length)
             candidates_changed = True
     if not silent:
         if candidates_changed:
-            logging.info(str_puzzle(candidates))
+            get_logger().info(str_puzzle(candidates))
         else:
-            logging.info("<no changes>")
+            get_logger().info("<no changes>")
 
 
 def exclude_cells_with_same_possible_values(sudoku, cells, missing_values, silent=False):
@@ -217,15 +823,14 @@ def exclude_cells_with_same_possible_values(sudoku, cells, missing_values, silen
     cells = list(cells)
     for cell in cells:
         i, j = cell
-        possible_values = get_possibles_for_cell(sudoku, i, j)
-        pv_hash = "_".join(sorted(list(possible_values)))
+        pv_hash = sudoku.get_candidates_mask(i, j)
         if pv_hash not in possible_values_cells:
             possible_values_cells[pv_hash] = []
-            original_sets[pv_hash] = possible_values
+            original_sets[pv_hash] = sudoku.mask_to_values(pv_hash)
         possible_values_cells[pv_hash].append(cell)
 
     if not silent:
-        logging.debug("possible cells for values: {}".format(possible_values_cells))
+        get_logger().debug("possible cells for values: %s", possible_values_cells)
 
     for k, v in possible_values_cells.items():
         if len(original_sets[k]) == len(possible_values_cells[k]) and len(original_sets[k]) != 1:
@@ -236,22 +841,21 @@ def exclude_cells_with_same_possible_values(sudoku, cells, missing_values, silen
             cells = [cell for cell in cells if cell not in v]
 
     if not silent:
-        logging.debug("after stripping guesses: missing {} in cells {}".format(missing_values, cells))
+        get_logger().debug("after stripping guesses: missing %s in cells %s", missing_values, cells)
     return cells, missing_values
 
 
 def find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=False):
     length = 5
-    candidates_changed = False
-    zone_content = [sudoku.puzzle[cell[0]][cell[1]] for cell in zone_cells ]
-    candidates = generate_scratch(sudoku, length, sudoku.acceptable_values)
+    zone_content = [sudoku.puzzle[cell[0]][cell[1]] for cell in zone_cells]
+    candidates = None if silent else generate_scratch(sudoku, length, sudoku.acceptable_values)
     missing_from_zone = get_missing(set(zone_content), sudoku.acceptable_values)
     if not missing_from_zone:
         return
     elif not silent:
-        logging.debug("{}: missing: {}".format(zone_description, missing_from_zone))
+        get_logger().debug("%s: missing: %s", zone_description, missing_from_zone)
     # find N cells with N variants where variants are equal between cells
-    empty_cells = [cell for cell in zone_cells if sudoku.puzzle[cell[0]][cell[1]] not in sudoku.acceptable_values ]
+    empty_cells = [cell for cell in zone_cells if not sudoku.values[cell[0] * sudoku.size + cell[1]]]
     empty_cells, missing_from_zone = \
         exclude_cells_with_same_possible_values(sudoku,
                                                 empty_cells,
@@ -260,94 +864,523 @@ def find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=False):
     for missing_digit in missing_from_zone:
         possible_cells = []
 
+        bit = sudoku.bits[missing_digit]
         for cell in empty_cells:
             i, j = cell
-            if missing_digit in get_possibles_for_cell(sudoku, i, j):
+            if sudoku.get_candidates_mask(i, j) & bit:
                 possible_cells.append(cell)
         if len(possible_cells) == 1:
             i, j = possible_cells[0]
             # цифра может быть только в 1 месте
-            sudoku.puzzle[i][j] = missing_digit
+            sudoku.place(i, j, missing_digit)
             empty_cells = [cell for cell in empty_cells if cell != possible_cells[0]]
-            candidates[i][j] = "{:^{}}".format(" >{}< ".format(missing_digit), length)
-            candidates_changed = True
+            if not silent:
+                candidates[i][j] = "{:^{}}".format(" >{}< ".format(missing_digit), length)
         if not silent:
-            logging.debug("\t[{}] can be in: {}".format(missing_digit, possible_cells))
+            get_logger().debug("\t[%s] can be in: %s", missing_digit, possible_cells)
     for cell in empty_cells:
         i, j = cell
         possible_values = missing_from_zone & get_possibles_for_cell(sudoku, i, j)
         if len(possible_values) == 1:
             # цифра может быть только в 1 месте
             value = list(possible_values)[0]
-            sudoku.puzzle[i][j] = value
+            sudoku.place(i, j, value)
             empty_cells = [e_cell for e_cell in empty_cells if e_cell != cell]
-            candidates[i][j] = "{:^{}}".format(" >{}< ".format(value), length)
-            candidates_changed = True
+            if not silent:
+                candidates[i][j] = "{:^{}}".format(" >{}< ".format(value), length)
 
 
 def run_find_cell_candidates(sudoku, silent=False):
-    length = 5
-    candidates_changed = False
-    candidates = generate_scratch(sudoku, length, sudoku.acceptable_values)
     for i_zone in range(sudoku.size):
-        zone_description = "Column C{}".format(i_zone)
+        zone_description = None if silent else "Column C{}".format(i_zone)
         zone_cells = [(i, i_zone) for i in range(sudoku.size)]
-        find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=False)
+        find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=silent)
     for i_zone in range(sudoku.size):
-        zone_description = "Row R{}".format(i_zone)
+        zone_description = None if silent else "Row R{}".format(i_zone)
         zone_cells = [(i_zone, i) for i in range(sudoku.size)]
-        find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=False)
-    n_regions = 3
+        find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=silent)
+    n_regions = sudoku.geometry.box
     for region_i in range(n_regions):
         for region_j in range(n_regions):
-            zone_description = "Region {} {}".format(region_i, region_j)
-            zone_cells = get_region_cells(region_i, region_j)
-            find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=False)
-    if not silent:
-        if candidates_changed:
-            logging.info(str_puzzle(candidates))
+            zone_description = None if silent else "Region {} {}".format(region_i, region_j)
+            zone_cells = get_region_cells(region_i, region_j, n_regions)
+            find_exclude_in_zone(sudoku, zone_cells, zone_description, silent=silent)
+
+
+def propagate(sudoku, observer=None, stats=None, naked_subsets=True):
+    """
+    Processes queued candidate changes until the queue is empty.
+
+    For every changed cell only the cell itself and its units are re-examined:
+    the cell is filled when one candidate is left (as in ``find_single_missing``),
+    every removed digit is placed if the unit has a single cell left for it
+    (as in ``find_exclude_in_zone``). When the queue is empty, digits of N cells sharing
+    the same N candidates are removed from the rest of every unit touched so far
+    (as in ``exclude_cells_with_same_possible_values``), once per unit.
+    New changes go to the same queue.
+    :param observer: ``Observer`` notified of placements and eliminations
+    :param stats: ``SolveStats`` to count work of every strategy in
+    :param naked_subsets: look for naked subsets; they seldom pay off inside exhaustive search
+    :raises ZeroCandidatesException: the puzzle has no solution
+    """
+    if stats is not None:
+        single_stats = stats.strategy("find_single_missing")
+        zone_stats = stats.strategy("find_exclude_in_zone")
+        subset_stats = stats.strategy("exclude_cells_with_same_possible_values")
+        clock = perf_counter
+    queue = sudoku.queue
+    pending = sudoku.pending
+    values = sudoku.values
+    candidates = sudoku.candidates
+    unit_masks = sudoku.unit_masks
+    units = sudoku.geometry.units
+    cell_units = sudoku.geometry.cell_units
+    dirty = set()
+    while queue:
+        while queue:
+            k = queue.popleft()
+            removed = pending[k]
+            pending[k] = 0
+            if stats is not None:
+                start = clock()
+                single_stats.calls += 1
+            mask = candidates[k]
+            if not values[k] and not mask & (mask - 1):
+                if observer is not None:
+                    observer.placement(divmod(k, sudoku.size), sudoku.symbols[mask.bit_length() - 1],
+                                       "find_single_missing")
+                eliminated = sudoku.place_bit(k, mask)
+                if stats is not None:
+                    single_stats.placed += 1
+                    single_stats.eliminated += eliminated
+            if stats is not None:
+                now = clock()
+                single_stats.time += now - start
+                start = now
+                zone_stats.calls += 1
+            for u in cell_units[k]:
+                if naked_subsets:
+                    dirty.add(u)
+                missing = removed & ~unit_masks[u]
+                while missing:
+                    bit = missing & -missing
+                    missing ^= bit
+                    if unit_masks[u] & bit:
+                        continue
+                    places = [p for p in units[u] if candidates[p] & bit]
+                    if not places:
+                        raise ZeroCandidatesException(divmod(k, sudoku.size))
+                    if len(places) == 1:
+                        if observer is not None:
+                            observer.placement(divmod(places[0], sudoku.size),
+                                               sudoku.symbols[bit.bit_length() - 1], "find_exclude_in_zone")
+                        eliminated = sudoku.place_bit(places[0], bit)
+                        if stats is not None:
+                            zone_stats.placed += 1
+                            zone_stats.eliminated += eliminated
+            if stats is not None:
+                zone_stats.time += clock() - start
+        if not dirty:
+            break
+        if stats is not None:
+            start = clock()
+            subset_stats.calls += len(dirty)
+        while dirty:
+            eliminated = exclude_naked_subsets(sudoku, dirty.pop(), observer)
+            if stats is not None:
+                subset_stats.eliminated += eliminated
+        if stats is not None:
+            subset_stats.time += clock() - start
+
+
+def exclude_naked_subsets(sudoku, u, observer=None):
+    """
+    Finds N empty cells of the unit with the same N candidates
+    and removes those candidates from other cells of the unit
+    :return: number of candidates eliminated
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    empty_cells = [p for p in sudoku.geometry.units[u] if not values[p]]
+    same_masks = {}
+    for p in empty_cells:
+        mask = candidates[p]
+        same_masks[mask] = same_masks.get(mask, 0) + 1
+    eliminated = 0
+    for mask, count in same_masks.items():
+        if count > 1 and count == mask.bit_count() and count < len(empty_cells):
+            for p in empty_cells:
+                if candidates[p] != mask and candidates[p] & mask:
+                    if observer is not None:
+                        observer.elimination(divmod(p, sudoku.size), sudoku.mask_to_values(candidates[p] & mask),
+                                             "exclude_cells_with_same_possible_values")
+                    eliminated += (candidates[p] & mask).bit_count()
+                    sudoku.eliminate(p, candidates[p] & mask)
+    return eliminated
+
+
+def deduce(sudoku, pipeline=deductions.PIPELINE, observer=None, stats=None):
+    """
+    Propagates, then runs strategies of the pipeline in order until one of them removes candidates,
+    and starts over from propagation; stops when the grid is filled or no strategy progresses.
+    :param pipeline: sequence of strategies, see ``deductions``; counted in stats by function name
+    :return: number of candidates removed by the pipeline
+    :raises ZeroCandidatesException: the puzzle has no solution
+    """
+    removed = 0
+    while True:
+        propagate(sudoku, observer, stats)
+        if sudoku.is_finished():
+            return removed
+        for strategy in pipeline:
+            if stats is not None:
+                start = perf_counter()
+            eliminated = strategy(sudoku, observer)
+            if stats is not None:
+                strategy_stats = stats.strategy(strategy.__name__)
+                strategy_stats.calls += 1
+                strategy_stats.eliminated += eliminated
+                strategy_stats.time += perf_counter() - start
+            if eliminated:
+                removed += eliminated
+                break
         else:
-            logging.info("<no changes>")
+            return removed
 
 
-def nishio(sudoku, silent=False):
+def nishio(sudoku, observer=None, stats=None, budget=None):
+    """
+    Tries every candidate of empty cells one cell at a time.
+    Works in place: hypotheses are rolled back with ``SudokuPuzzle.undo``; if one of them solves
+    the puzzle or only one survives, it is kept in the grid. Hypotheses that led to contradiction
+    are nogoods: they are removed from candidates, so later hypotheses and rounds never
+    propagate into them again.
+    :param budget: ``Budget`` charged a node for every hypothesis
+    :return: the same SudokuPuzzle if it has progressed, None otherwise
+    :raises ZeroCandidatesException: every candidate of some cell leads to contradiction
+    :raises LimitReached: budget is exhausted; no hypothesis is left in the grid
+    """
     for cell in sudoku.get_empty_cells():
         i, j = cell
-        acceptable_here = get_possibles_for_cell(sudoku, i, j)
-        if not acceptable_here:
-            raise ZeroCandidatesException(cell)
-
-        if not silent:
-            logging.info("[!] Running hypothesis for cell {} (candidates {}).".format(cell, acceptable_here))
+        k = i * sudoku.size + j
+        mask = sudoku.candidates[k]
         possible_solutions = []
-        for guess in acceptable_here:
-            if not silent:
-                logging.info("[*] Suppose cell {} is {}. Trying to solve or fail.".format(cell, guess))
-            new_puzzle = deepcopy(sudoku.puzzle)
-            new_puzzle[i][j] = guess
-            guess_sudoku = SudokuPuzzle(new_puzzle, sudoku.acceptable_values)
-
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            if budget is not None:
+                budget.node()
+            if observer is not None:
+                observer.hypothesis(cell, sudoku.symbols[bit.bit_length() - 1], 0)
+            mark = sudoku.mark()
+            if stats is not None:
+                stats.nodes += 1
+                stats.max_depth = max(stats.max_depth, 1)
             try:
-                hypothesis_result = guess_sudoku.solve(silent=True, enable_desperate=False)
-                if hypothesis_result.is_finished():
-                    if not silent:
-                        logging.info("[+] Hypothesis found solution, returning.")
-                    return hypothesis_result
-                else:
-                    possible_solutions.append(hypothesis_result)
-                    if not silent:
-                        logging.info("[~] Hypothesis found PARTIAL solution, adding.")
+                sudoku.place_bit(k, bit)
+                propagate(sudoku)
+                if sudoku.is_finished():
+                    return sudoku
+                possible_solutions.append(bit)
             except ZeroCandidatesException as x:
-                if not silent:
-                    logging.info("[x] Hypothesis found contradiction at cell {}, continuing.".format(x.cell))
+                if observer is not None:
+                    observer.contradiction(x.cell, 0)
+            if stats is not None:
+                stats.backtracks += 1
+            sudoku.undo(mark)
+        if not possible_solutions:
+            raise ZeroCandidatesException(cell)
         if len(possible_solutions) == 1:
-            return possible_solutions[0]
+            if observer is not None:
+                observer.placement(cell, sudoku.symbols[possible_solutions[0].bit_length() - 1], "nishio")
+            sudoku.place_bit(k, possible_solutions[0])
+            propagate(sudoku, observer, stats)
+            return sudoku
+        dead = sudoku.candidates[k] & ~sum(possible_solutions)
+        if dead:
+            if observer is not None:
+                observer.elimination(cell, sudoku.mask_to_values(dead), "nishio")
+            sudoku.eliminate(k, dead)
+            propagate(sudoku, observer, stats)
+            return sudoku
+    return None
+
+
+def pick_cell(sudoku):
+    """
+    Returns empty cell number with the fewest candidates, None if the grid is filled
+    """
+    values = sudoku.values
+    candidates = sudoku.candidates
+    best = None
+    best_count = len(sudoku.symbols) + 1
+    for k in range(len(values)):
+        if not values[k]:
+            count = candidates[k].bit_count()
+            if count < best_count:
+                best = k
+                best_count = count
+                if count <= 2:
+                    break
+    return best
+
+
+def pick_branch(sudoku):
+    """
+    Returns alternatives to branch on as (cell number, bit) pairs: candidates of the cell
+    with the fewest candidates, or places of a digit in a unit if it has fewer places.
+    None if the grid is filled, empty list if some digit has no place left.
+    """
+    k = pick_cell(sudoku)
+    if k is None:
+        return None
+    mask = sudoku.candidates[k]
+    best = []
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        best.append((k, bit))
+    if len(best) <= 2:
+        return best
+    values = sudoku.values
+    candidates = sudoku.candidates
+    unit_masks = sudoku.unit_masks
+    units = sudoku.geometry.units
+    for u in range(len(units)):
+        missing = sudoku.full_mask & ~unit_masks[u]
+        if not missing:
+            continue
+        cells = [p for p in units[u] if not values[p]]
+        while missing:
+            bit = missing & -missing
+            missing ^= bit
+            places = [p for p in cells if candidates[p] & bit]
+            if len(places) < len(best):
+                best = [(p, bit) for p in places]
+                if len(best) <= 2:
+                    return best
+    return best
+
+
+def search(sudoku, observer=None, depth=0, stats=None, budget=None, pipeline=None):
+    """
+    Complete depth-first search: propagates, then tries every alternative
+    from ``pick_branch`` and recurses.
+    Works in place, guesses are rolled back with ``SudokuPuzzle.undo``.
+    :param budget: ``Budget`` charged a node for every call
+    :param pipeline: strategies to run at every node after propagation, see ``deduce``
+    :return: the same SudokuPuzzle, solved, or None if the puzzle has no solution
+    :raises LimitReached: budget is exhausted; all guesses are rolled back,
+        the grid is left as the first propagation made it
+    """
+    if budget is not None:
+        budget.node()
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+    try:
+        if pipeline:
+            deduce(sudoku, pipeline, observer, stats)
+        else:
+            propagate(sudoku, observer, stats)
+    except ZeroCandidatesException as x:
+        if observer is not None:
+            observer.contradiction(x.cell, depth)
+        return None
+    branch = pick_branch(sudoku)
+    if branch is None:
+        return sudoku
+    for k, bit in branch:
+        if observer is not None:
+            observer.hypothesis(divmod(k, sudoku.size), sudoku.symbols[bit.bit_length() - 1], depth)
+        mark = sudoku.mark()
+        try:
+            sudoku.place_bit(k, bit)
+            if stats is not None:
+                stats.strategy("search").placed += 1
+            if search(sudoku, observer, depth + 1, stats, budget, pipeline) is not None:
+                return sudoku
+        except ZeroCandidatesException as x:
+            if observer is not None:
+                observer.contradiction(x.cell, depth)
+        except LimitReached:
+            sudoku.undo(mark)
+            raise
+        if stats is not None:
+            stats.backtracks += 1
+        sudoku.undo(mark)
+    return None
+
+
+def count_solutions(sudoku, limit=None, budget=None):
+    """
+    Counts solutions with the same branching as ``search`` and singles-only propagation;
+    alternatives of a branch exclude each other, so no solution is counted twice.
+    Works in place, the grid is left as it was after propagation.
+    :param limit: stop counting when this many solutions are found
+    :param budget: ``Budget`` charged a node for every call
+    :return: number of solutions, at most ``limit``
+    :raises LimitReached: budget is exhausted; all guesses are rolled back
+    """
+    if budget is not None:
+        budget.node()
+    mark = sudoku.mark()
+    try:
+        propagate(sudoku, naked_subsets=False)
+    except ZeroCandidatesException:
+        sudoku.undo(mark)
+        return 0
+    branch = pick_branch(sudoku)
+    if branch is None:
+        return 1
+    found = 0
+    for k, bit in branch:
+        mark = sudoku.mark()
+        try:
+            sudoku.place_bit(k, bit)
+            found += count_solutions(sudoku, None if limit is None else limit - found, budget)
+        except ZeroCandidatesException:
+            pass
+        except LimitReached:
+            sudoku.undo(mark)
+            raise
+        sudoku.undo(mark)
+        if limit is not None and found >= limit:
+            break
+    return found
+
+
+def read_lines(source):
+    """
+    Yields puzzle lines from file name, open file or any iterable of strings.
+    Empty lines and lines starting with '#' are skipped.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as file:
+            yield from read_lines(file)
+        return
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def solve_status(line, engine="search", acceptable_values=None, silent=True, **limits):
+    """
+    Solves one puzzle line; ``batch``, ``server`` and the command line report its outcome
+    :param limits: ``deadline``, ``timeout`` and the other limits of ``SudokuPuzzle.solve``
+    :return: status (see ``SudokuPuzzle.solve``, or "no_solution", or "invalid" for a line
+        ``from_line`` rejects), solved or partial SudokuPuzzle or None
+    """
+    try:
+        sudoku = SudokuPuzzle.from_line(line, acceptable_values)
+    except ValueError:
+        return "invalid", None
+    except ZeroCandidatesException:
+        return "no_solution", None
+    try:
+        result = sudoku.solve(silent=silent, engine=engine, stats=False, **limits)
+    except (ZeroCandidatesException, NoSolutionException):
+        return "no_solution", None
+    return result.status, result
+
+
+CLI_FORMATS = ("text", "jsonl", "html")
+CLI_ENGINES = ("search", "dlx", "strategies")
+
+
+def argument_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m sudoku", description="Solves sudoku puzzles, one per line.")
+    parser.add_argument("files", nargs="*", help="puzzle files, stdin if none or '-'")
+    parser.add_argument("--format", choices=CLI_FORMATS, default="text")
+    parser.add_argument("--engine", choices=CLI_ENGINES, default="search")
+    parser.add_argument("--timeout", type=float, help="seconds per puzzle")
+    parser.add_argument("--verbose", action="store_true", help="log solver steps to stderr")
+    return parser
+
+
+def parse_args(argv):
+    """
+    Parses the command line of ``main``. Valid command lines are parsed here, ``argparse``
+    (it takes longer to import than the rest of the start) only reports help and errors.
+    """
+    from types import SimpleNamespace
+    args = SimpleNamespace(files=[], format="text", engine="search", timeout=None, verbose=False)
+    choices = {"format": CLI_FORMATS, "engine": CLI_ENGINES}
+    arguments = iter(argv)
+    try:
+        for arg in arguments:
+            if arg == "--verbose":
+                args.verbose = True
+            elif arg.startswith("--") and arg[2:].partition("=")[0] in ("format", "engine", "timeout"):
+                name, separator, value = arg[2:].partition("=")
+                if not separator:
+                    value = next(arguments)
+                if name == "timeout":
+                    value = float(value)
+                elif value not in choices[name]:
+                    raise ValueError(value)
+                setattr(args, name, value)
+            elif arg.startswith("-") and arg != "-":
+                raise ValueError(arg)
+            else:
+                args.files.append(arg)
+    except (StopIteration, ValueError):
+        return argument_parser().parse_args(argv)
+    return args
+
+
+def main(argv=None):
+    """
+    ``python -m sudoku [files] [--format text|jsonl|html]``: reads puzzle lines, see
+    ``SudokuPuzzle.from_line``, and writes every result to stdout as soon as it is found:
+
+        text   grid line (solution, partial grid or the puzzle) and status, separated by a space
+        jsonl  {"puzzle": ..., "status": ..., "solution": ...}, "partial" instead of "solution" if not solved
+        html   one document with a table per puzzle, as ``htmltable`` draws them
+
+    :return: exit code, 0 if every puzzle was solved, 1 otherwise
+    """
+    import sys
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.verbose:
+        import logging
+        logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    out = sys.stdout
+    document = None
+    if args.format == "jsonl":
+        import json
+    elif args.format == "html":
+        import htmltable
+        document = htmltable.Document(out)
+    exit_code = 0
+    try:
+        for line in chain.from_iterable(read_lines(sys.stdin if name == "-" else name)
+                                        for name in args.files or ["-"]):
+            status, result = solve_status(line, args.engine, silent=not args.verbose, timeout=args.timeout)
+            if status != "solved":
+                exit_code = 1
+            grid = result.to_line() if result is not None else line
+            if args.format == "text":
+                out.write(grid + " " + status + "\n")
+            elif args.format == "jsonl":
+                record = {"puzzle": line, "status": status}
+                if result is not None:
+                    record["solution" if status == "solved" else "partial"] = grid
+                out.write(json.dumps(record) + "\n")
+            else:
+                document.write(result.puzzle if result is not None else None, "{}: {}".format(status, line))
+            out.flush()
+        if document is not None:
+            document.close()
+    except BrokenPipeError:
+        # the reader has gone (e.g. ``| head``): stop quietly, also when the output is flushed at exit
+        import os
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        return 1
+    return exit_code
 
 
 if __name__ == "__main__":
-    hard = SudokuPuzzle(sample.medium["puzzle"], sample.acceptable_values)
-    logging.warning("Puzzle:\n{}".format(hard))
-    solved = hard.solve()
-    logging.warning("="*80)
-    logging.warning("\n\n\n\nSolved:\n{}".format(solved))
-    htmltable.table(solved.puzzle)
+    raise SystemExit(main())
@@ -1,5 +1,28 @@
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+import unittest.mock
+import batch
+import bench
+import cache
+import deductions
+import dlx
+import generator
+import latency
+import packed
+import parallel
 import sample
+import server
+import session
 import sudoku
 
 
@@ -51,6 +74,1009 @@ class MyTestCase(unittest.TestCase):
         self.assertNotIn((2, 3), cells)
 
 
+class CandidatesTestCase(unittest.TestCase):
+    def test_candidates_match_units(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        for i, j in easy.get_empty_cells():
+            expected = sample.acceptable_values.difference(
+                easy.get_row(i) + easy.get_column(j) + easy.get_region_by_rc(i, j))
+            self.assertEqual(easy.get_candidates(i, j), expected)
+
+    def test_place_updates_peers(self):
+        easy = sudoku.SudokuPuzzle([list(row) for row in sample.easy["puzzle"]], sample.acceptable_values)
+        easy.place(0, 0, "7")
+        self.assertEqual(easy.puzzle[0][0], "7")
+        self.assertEqual(easy.get_candidates(0, 0), {"7"})
+        self.assertNotIn("7", easy.get_candidates(0, 1))
+        self.assertNotIn("7", easy.get_candidates(5, 0))
+        self.assertNotIn("7", easy.get_candidates(1, 1))
+        self.assertIn((0, 1), easy.get_empty_cells())
+        self.assertNotIn((0, 0), easy.get_empty_cells())
+
+    def test_place_rejects_non_candidate(self):
+        easy = sudoku.SudokuPuzzle([list(row) for row in sample.easy["puzzle"]], sample.acceptable_values)
+        with self.assertRaises(sudoku.ZeroCandidatesException):
+            easy.place(0, 0, "6")
+
+    def test_undo_restores_state(self):
+        easy = sudoku.SudokuPuzzle.from_line(BatchTestCase.easy_line)
+        state = (list(easy.values), list(easy.candidates), list(easy.unit_masks))
+        mark = easy.mark()
+        easy.place(0, 0, "7")
+        sudoku.propagate(easy)
+        self.assertTrue(easy.is_finished())
+        easy.undo(mark)
+        self.assertEqual((list(easy.values), list(easy.candidates), list(easy.unit_masks)), state)
+        self.assertEqual(easy.puzzle[0][0], "X")
+        self.assertFalse(easy.queue)
+
+    def test_duplicate_givens(self):
+        with self.assertRaises(sudoku.ZeroCandidatesException):
+            sudoku.SudokuPuzzle.from_line("11" + "." * 79)
+
+
+class PropagationTestCase(unittest.TestCase):
+    def test_propagate_solves_easy(self):
+        easy = sudoku.SudokuPuzzle([list(row) for row in sample.easy["puzzle"]], sample.acceptable_values)
+        sudoku.propagate(easy)
+        self.assertEqual(easy.puzzle, sample.easy["solution"])
+        self.assertFalse(easy.queue)
+
+    def test_propagate_is_driven_by_queue(self):
+        empty = sudoku.SudokuPuzzle([list(row) for row in sample.empty], sample.acceptable_values)
+        self.assertFalse(empty.queue)
+        empty.place(0, 0, "1")
+        # 20 peers lost "1", the cell itself lost the other 8 digits
+        self.assertEqual(len(empty.queue), 21)
+        self.assertEqual(empty.pending[0], empty.full_mask & ~empty.bits["1"])
+        sudoku.propagate(empty)
+        self.assertFalse(empty.queue)
+        self.assertFalse(empty.is_finished())
+
+    def test_contradiction(self):
+        puzzle = [list(row) for row in sample.easy["puzzle"]]
+        puzzle[0][0] = "1"
+        with self.assertRaises(sudoku.ZeroCandidatesException):
+            sudoku.SudokuPuzzle(puzzle, sample.acceptable_values).solve(silent=True)
+
+
+class ValidSolutionMixin:
+    def assertValidSolution(self, puzzle, solved):
+        self.assertTrue(solved.is_finished())
+        for i in range(solved.size):
+            self.assertEqual(set(solved.get_row(i)), sample.acceptable_values)
+            self.assertEqual(set(solved.get_column(i)), sample.acceptable_values)
+            self.assertEqual(set(solved.get_region(i // 3, i % 3)), sample.acceptable_values)
+            for j in range(solved.size):
+                if puzzle[i][j] != "X":
+                    self.assertEqual(solved.puzzle[i][j], puzzle[i][j])
+
+
+class SearchTestCase(ValidSolutionMixin, unittest.TestCase):
+    def test_search_solves_hard(self):
+        hard = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        self.assertValidSolution(sample.hard["puzzle"], hard.solve(silent=True, engine="search"))
+
+    def test_search_solves_empty(self):
+        empty = sudoku.SudokuPuzzle(sample.empty, sample.acceptable_values)
+        self.assertValidSolution(sample.empty, empty.solve(silent=True, engine="search"))
+
+    def test_search_does_not_touch_original(self):
+        easy = sudoku.SudokuPuzzle([list(row) for row in sample.easy["puzzle"]], sample.acceptable_values)
+        solved = easy.solve(silent=True, engine="search")
+        self.assertEqual(solved.puzzle, sample.easy["solution"])
+        self.assertEqual(easy.puzzle, sample.easy["puzzle"])
+
+    def test_search_no_solution(self):
+        puzzle = [list(row) for row in sample.empty]
+        puzzle[0][:8] = list("12345678")
+        puzzle[1][8] = "9"
+        su = sudoku.SudokuPuzzle(puzzle, sample.acceptable_values)
+        with self.assertRaises(sudoku.NoSolutionException):
+            su.solve(silent=True, engine="search")
+
+    def test_unknown_engine(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        with self.assertRaises(ValueError):
+            easy.solve(engine="guess")
+
+
+class CountSolutionsTestCase(unittest.TestCase):
+    def test_unique(self):
+        hard = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        self.assertEqual(hard.count_solutions(), 1)
+        self.assertTrue(hard.is_unique())
+        self.assertEqual(hard.puzzle, sample.hard["puzzle"])
+
+    def test_limit(self):
+        empty = sudoku.SudokuPuzzle(sample.empty, sample.acceptable_values)
+        self.assertEqual(empty.count_solutions(limit=5), 5)
+        self.assertFalse(empty.is_unique())
+
+    def test_exact_count(self):
+        self.assertTrue(sudoku.SudokuPuzzle.from_line(BatchTestCase.easy_solution).is_unique())
+        # rows 1-2 hold 9,4 and 4,9 in columns 2 and 3: the rectangle can be filled both ways
+        line = list(BatchTestCase.easy_solution)
+        for k in (11, 12, 20, 21):
+            line[k] = "."
+        self.assertEqual(sudoku.SudokuPuzzle.from_line("".join(line)).count_solutions(), 2)
+
+    def test_no_solution(self):
+        su = sudoku.SudokuPuzzle.from_line("12345678." + "." * 8 + "9" + "." * 63)
+        self.assertEqual(su.count_solutions(), 0)
+        self.assertFalse(su.is_unique())
+
+    def test_bundled_corpora(self):
+        for line in bench.load_corpus("medium"):
+            self.assertTrue(sudoku.SudokuPuzzle.from_line(line).is_unique())
+        counts = [sudoku.SudokuPuzzle.from_line(line).count_solutions(limit=2)
+                  for line in bench.load_corpus("pathological")]
+        self.assertEqual(counts[-2:], [0, 0])
+
+
+class LimitsTestCase(unittest.TestCase):
+    # strategies need five rounds of propagation and nishio here
+    line = ".3.....1224.8....5..9......8..47.........6.7....3.26.8.1....3..4..2...6....5....9"
+
+    def setUp(self):
+        self.hard = sudoku.SudokuPuzzle.from_line(self.line)
+        self.solution = self.hard.solve(silent=True, engine="dlx")
+
+    def assertSoundPartial(self, partial):
+        self.assertFalse(partial.is_finished())
+        for value, solved in zip(partial.values, self.solution.values):
+            self.assertIn(value, (0, solved))
+
+    def test_status_without_limits(self):
+        self.assertEqual(self.solution.status, "solved")
+        self.assertEqual(self.hard.solve(silent=True).status, "solved")
+        self.assertEqual(self.hard.solve(silent=True, enable_desperate=False).status, "unsolved")
+
+    def test_node_limit(self):
+        for engine in ("search", "strategies", "dlx"):
+            partial = self.hard.solve(silent=True, engine=engine, max_nodes=3)
+            self.assertEqual(partial.status, "node_limit")
+            self.assertSoundPartial(partial)
+        partial = self.hard.solve(silent=True, engine="search", max_nodes=3)
+        self.assertLess(partial.values.count(0), self.hard.values.count(0))
+
+    def test_round_limit(self):
+        partial = self.hard.solve(silent=True, max_rounds=1)
+        self.assertEqual(partial.status, "round_limit")
+        self.assertSoundPartial(partial)
+
+    def test_timeout(self):
+        for engine in ("search", "strategies", "dlx"):
+            partial = self.hard.solve(silent=True, engine=engine, timeout=0)
+            self.assertEqual(partial.status, "timeout")
+            self.assertSoundPartial(partial)
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        self.assertEqual(self.hard.solve(silent=True, engine="search", cancel=cancel).status, "solved")
+        cancel.set()
+        self.assertEqual(self.hard.solve(silent=True, engine="search", cancel=cancel).status, "cancelled")
+
+
+class DlxTestCase(ValidSolutionMixin, unittest.TestCase):
+    def test_dlx_solves(self):
+        for puzzle in (sample.easy["puzzle"], sample.medium["puzzle"], sample.hard["puzzle"], sample.empty):
+            su = sudoku.SudokuPuzzle(puzzle, sample.acceptable_values)
+            self.assertValidSolution(puzzle, su.solve(engine="dlx"))
+
+    def test_dlx_enumerates(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        self.assertEqual([s.puzzle for s in dlx.solutions(easy)], [sample.easy["solution"]])
+        empty = sudoku.SudokuPuzzle(sample.empty, sample.acceptable_values)
+        found = list(dlx.solutions(empty, limit=5))
+        self.assertEqual(len(found), 5)
+        self.assertEqual(len(set(str(s.puzzle) for s in found)), 5)
+
+    def test_dlx_no_solution(self):
+        puzzle = [list(row) for row in sample.empty]
+        puzzle[0][:8] = list("12345678")
+        puzzle[1][8] = "9"
+        su = sudoku.SudokuPuzzle(puzzle, sample.acceptable_values)
+        self.assertIsNone(dlx.solve(su))
+        with self.assertRaises(sudoku.NoSolutionException):
+            su.solve(engine="dlx")
+
+
+class LargeBoardTestCase(unittest.TestCase):
+    line16 = (
+        "..3..4.B2..5..E..A.G.......679..1.F.......9.A...8....3..G4B...2F"
+        ".4.AF........D782..5..6E7...4G.9..8.....5..F......1.38....G..2.."
+        ".1.C.E........FG.B....C6.....A.D..D...F5C.6.8.3E..E39..A.G5B..C."
+        ".2...6..9..DG...FG..2...86...4..4..9.AB..5.2E3..3.....9...F..C.5")
+    line25 = (
+        ".17G.AH.4K.8.B.CF5ONJID.MM..IDE.BL6291G73.A..5CONFFN..O.9G21...."
+        "J....6A..K.86.B.5..O.4H.3AI.J.P.G21..K...J.I.POF.C.G.7..EB..8.J9"
+        ".IHL.BEG2718.4F.AMN.5..7.1.F4K3ABLE6H..M.5...JDO.M.....G7I.JP96L"
+        "HBE.K3.44A.K3.DPIJ.O....28G7H6..LLEH.BMONC.3...F...I..1.72AC..F1"
+        "...GM5ID..7.8.K..3E5...M.7L8..JG.14.KH.NOF.A.3.4H.5DM.FA..N2J.9."
+        "6L8B7..12.KE.H...B..OANFCPDM.5.B6L..AOFCHE3..D5.M....G..8L.1.3A."
+        "..BH..5.DNM..P.I..2..4B.......L.3O.FD5.MC...E..C5NMK.F.O.I2P9L71"
+        "8.3.OAK2.JP.NCM5D.G.184E..BC..5N...18.I..2..4....KF..D.M5.18.L.P"
+        "29G.63.4CF.OK.O.....9J25NDMI81B7.3H..6P...J36H.47...BFK..O..5.N6"
+        "..HE...5D.KOFC9.GJ2B.7.1...8.CKFAO.64...NI.DG9.2P")
+
+    def assertValidSolution(self, line, solved):
+        self.assertTrue(solved.is_finished())
+        for given, value in zip(line, solved.to_line()):
+            self.assertIn(given, (".", value))
+        for unit in solved.geometry.units:
+            self.assertEqual(len({solved.values[k] for k in unit}), solved.size)
+
+    def test_default_symbols(self):
+        su = sudoku.SudokuPuzzle.from_line(self.line16)
+        self.assertEqual(su.symbols, tuple("123456789ABCDEFG"))
+        self.assertEqual(su.geometry.box, 4)
+        self.assertEqual(len(su.geometry.peers[0]), 39)
+        self.assertEqual(su.to_line(), self.line16)
+
+    def test_tokens(self):
+        su = sudoku.SudokuPuzzle.from_line(self.line16)
+        numbers = {symbol: str(i + 1) for i, symbol in enumerate(su.symbols)}
+        tokens = " ".join(numbers.get(c, ".") for c in self.line16)
+        su = sudoku.SudokuPuzzle.from_line(tokens)
+        self.assertIn("16", su.symbols)
+        self.assertEqual(su.to_line(), tokens)
+        self.assertEqual(len(su.solve(silent=True, engine="search").to_line().split()), 256)
+
+    def test_bad_size(self):
+        with self.assertRaises(ValueError):
+            sudoku.SudokuPuzzle.from_line("1" * 36)
+        with self.assertRaises(ValueError):
+            sudoku.SudokuPuzzle.from_line(self.line16, sample.acceptable_values)
+
+    def test_sections(self):
+        self.assertEqual(sudoku.get_section(5, 4), (4, 8))
+        self.assertEqual(sudoku.get_region_cells(1, 1, 4)[0], (4, 4))
+        su = sudoku.SudokuPuzzle.from_line(self.line16)
+        self.assertEqual(len(su.get_region_by_rc(15, 15)), 16)
+        self.assertEqual(len(str(su).splitlines()), 32)
+
+    def test_solve_16(self):
+        for engine in ("search", "dlx"):
+            self.assertValidSolution(self.line16, sudoku.SudokuPuzzle.from_line(self.line16).solve(
+                silent=True, engine=engine))
+
+    def test_solve_25(self):
+        for engine in ("search", "dlx"):
+            self.assertValidSolution(self.line25, sudoku.SudokuPuzzle.from_line(self.line25).solve(
+                silent=True, engine=engine))
+
+    def test_legacy_sweeps(self):
+        su = sudoku.SudokuPuzzle.from_line(self.line16)
+        sudoku.run_find_cell_candidates(su, silent=True)
+        self.assertLess(su.values.count(0), self.line16.count("."))
+
+
+class BatchTestCase(unittest.TestCase):
+    easy_line = "".join("".join(row) for row in sample.easy["puzzle"])
+    easy_solution = "".join("".join(row) for row in sample.easy["solution"])
+
+    def test_line_roundtrip(self):
+        su = sudoku.SudokuPuzzle.from_line(self.easy_line.replace("X", "0"))
+        self.assertEqual(su.puzzle, sample.easy["puzzle"])
+        self.assertEqual(su.to_line(empty="X"), self.easy_line)
+        self.assertEqual(su.get_candidates(0, 0), {"1", "7"})
+
+    def test_bad_line(self):
+        with self.assertRaises(ValueError):
+            sudoku.SudokuPuzzle.from_line("123")
+        with self.assertRaises(ValueError):
+            sudoku.SudokuPuzzle.from_line("?" + self.easy_line[1:])
+        self.assertEqual(sudoku.SudokuPuzzle.from_line("_0X" + self.easy_line[3:]).to_line(),
+                         "..." + self.easy_line[3:].replace("X", "."))
+
+    def test_solve_status(self):
+        self.assertEqual(sudoku.solve_status(self.easy_line)[0], "solved")
+        self.assertEqual(sudoku.solve_status("11" + "." * 79), ("no_solution", None))
+        self.assertEqual(sudoku.solve_status("?" + self.easy_line[1:]), ("invalid", None))
+        status, partial = sudoku.solve_status(bench.load_corpus("hard")[0], engine="strategies")
+        self.assertEqual(status, "unsolved")
+        self.assertFalse(partial.is_finished())
+
+    def test_invalid_lines_do_not_stop(self):
+        lines = [self.easy_line, "?" + self.easy_line[1:], "123", self.easy_line]
+        expected = [self.easy_solution, None, None, self.easy_solution]
+        self.assertEqual(list(batch.solve_many(lines)), expected)
+        self.assertEqual(list(batch.solve_many_parallel(lines, workers=2, chunksize=1)), expected)
+
+    def test_solve_many(self):
+        lines = ["# comment", self.easy_line.replace("X", "."), "", "12345678" + "." * 9 + "9" + "." * 63]
+        results = batch.solve_many(iter(lines))
+        self.assertEqual(next(results), self.easy_solution)
+        self.assertIsNone(next(results))
+        self.assertEqual(list(results), [])
+
+    def test_solve_many_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "puzzles.txt")
+            with open(path, "w") as file:
+                file.write("{}\n{}\n".format(self.easy_line, "." * 81))
+            results = list(batch.solve_many(path, engine="dlx"))
+        self.assertEqual(results[0], self.easy_solution)
+        self.assertNotIn(".", results[1])
+
+    def test_solve_many_parallel(self):
+        lines = [self.easy_line, "." * 81, "12345678" + "." * 9 + "9" + "." * 63] * 5
+        expected = list(batch.solve_many(lines))
+        self.assertEqual(list(batch.solve_many_parallel(lines, workers=2, chunksize=2)), expected)
+        unordered = sorted(batch.solve_many_parallel(lines, workers=2, chunksize=4, ordered=False))
+        self.assertEqual([solution for index, solution in unordered], expected)
+        self.assertEqual([index for index, solution in unordered], list(range(len(lines))))
+
+    def test_stuck_strategies(self):
+        stuck = bench.load_corpus("hard")[0]
+        self.assertIsNone(batch.solve_line(stuck, engine="strategies"))
+        self.assertEqual(batch.solve_line(self.easy_line, engine="strategies"), self.easy_solution)
+
+
+@unittest.skipIf(importlib.util.find_spec("numpy") is None, "numpy is not installed")
+class VectorizedTestCase(unittest.TestCase):
+    lines = [BatchTestCase.easy_line,
+             "".join("".join(row) for row in sample.medium["puzzle"]),
+             "".join("".join(row) for row in sample.hard["puzzle"]),
+             "12345678" + "." * 9 + "9" + "." * 63,
+             "11" + "." * 79]
+
+    def test_encode_decode(self):
+        import vectorized
+        grid = vectorized.encode(self.lines)
+        self.assertEqual(grid.shape, (5, 9, 9))
+        self.assertEqual(grid[0, 0, 4], 6)
+        self.assertEqual(vectorized.decode(grid[:1], empty="X"), [BatchTestCase.easy_line])
+
+    def test_encode_bad_lines(self):
+        import vectorized
+        a, b, c = self.lines[:3]
+        for bad in ([a, b[:-1], c + "."], [a, "\u2160" + b[1:]], [a, "?" + b[1:]]):
+            with self.assertRaises(ValueError):
+                vectorized.encode(bad)
+            self.assertEqual(vectorized.solve_batch(bad), list(batch.solve_many(bad)))
+            self.assertIsNone(vectorized.solve_batch(bad)[1])
+
+    def test_singles_solve_easy(self):
+        import vectorized
+        grid = vectorized.encode(self.lines)
+        solved, contradiction = vectorized.run_singles(grid, vectorized.Tables(9))
+        self.assertEqual(list(solved), [True, True, False, False, False])
+        self.assertEqual(list(contradiction), [False, False, False, True, True])
+        self.assertEqual(vectorized.decode(grid[:1])[0], BatchTestCase.easy_solution)
+
+    def test_solve_batch_matches_solve_many(self):
+        import vectorized
+        self.assertEqual(vectorized.solve_batch(self.lines), list(batch.solve_many(self.lines)))
+        self.assertEqual(list(vectorized.solve_many(self.lines, batch_size=2)), list(batch.solve_many(self.lines)))
+
+    def test_stuck_strategies(self):
+        import vectorized
+        stuck = bench.load_corpus("hard")[0]
+        self.assertEqual(vectorized.solve_batch([stuck, BatchTestCase.easy_line], engine="strategies"),
+                         [None, BatchTestCase.easy_solution])
+
+
+class PackedTestCase(unittest.TestCase):
+    def roundtrip(self, lines, size=None, acceptable_values=None):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.sdkp")
+            self.assertEqual(packed.from_text(lines, path, size, acceptable_values), len(lines))
+            self.assertEqual(list(packed.to_text(path)), lines)
+            with packed.PackedReader(path) as reader:
+                self.assertEqual(len(reader), len(lines))
+                self.assertEqual(reader.puzzle(-1), sudoku.SudokuPuzzle.from_line(lines[-1], acceptable_values))
+                record_size = len(reader[0])
+            return os.path.getsize(path), record_size
+
+    def test_corpus(self):
+        lines = bench.load_corpus("medium")
+        file_size, record_size = self.roundtrip(lines)
+        self.assertEqual(record_size, 41)
+        self.assertLess(file_size, 64 + 41 * len(lines))
+
+    def test_large_boards(self):
+        self.assertEqual(self.roundtrip([LargeBoardTestCase.line16])[1], 160)
+        self.assertEqual(self.roundtrip([LargeBoardTestCase.line25])[1], 391)
+        numbers = {symbol: str(i + 1) for i, symbol in enumerate("123456789ABCDEFG")}
+        line = " ".join(numbers.get(c, ".") for c in LargeBoardTestCase.line16)
+        self.roundtrip([line], acceptable_values=sudoku.default_symbols(16, tokens=True))
+
+    def test_token_lines(self):
+        solved = sudoku.SudokuPuzzle.from_line(LargeBoardTestCase.line16).solve(silent=True, engine="search")
+        numbers = {symbol: str(i + 1) for i, symbol in enumerate("123456789ABCDEFG")}
+        line = " ".join(numbers[c] for c in solved.to_line())
+        self.roundtrip([line])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.sdkp")
+            packed.from_text([line], path)
+            with packed.PackedReader(path) as reader:
+                self.assertEqual(reader.numbers(0).count(0), 0)
+            with packed.PackedWriter(path, 16) as writer:
+                with self.assertRaises(ValueError):
+                    writer.write(line)
+
+    def test_not_packed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.txt")
+            with open(path, "w") as file:
+                file.write(BatchTestCase.easy_line)
+            with self.assertRaises(ValueError):
+                packed.PackedReader(path)
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "numpy is not installed")
+    def test_array(self):
+        import vectorized
+        lines = bench.load_corpus("easy") + [LargeBoardTestCase.line16]
+        with tempfile.TemporaryDirectory() as directory:
+            for size, group in ((9, lines[:-1]), (16, lines[-1:])):
+                path = os.path.join(directory, "corpus.sdkp")
+                packed.from_text(group, path, size)
+                with packed.PackedReader(path) as reader:
+                    grid = reader.array()
+                    self.assertEqual(grid.shape, (len(group), size, size))
+                    self.assertEqual(vectorized.decode(grid), group)
+                    self.assertEqual(vectorized.solve_grid(grid), vectorized.solve_batch(group))
+                    del grid
+
+
+class ObserverTestCase(unittest.TestCase):
+    class Recorder(sudoku.Observer):
+        def __init__(self):
+            self.events = []
+
+        def placement(self, cell, value, strategy):
+            self.events.append(("placement", cell, value, strategy))
+
+        def hypothesis(self, cell, value, depth):
+            self.events.append(("hypothesis", cell, value, depth))
+
+        def contradiction(self, cell, depth):
+            self.events.append(("contradiction", cell, depth))
+
+    def test_placements_reported(self):
+        recorder = self.Recorder()
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        solved = easy.solve(observer=recorder)
+        self.assertEqual(len(recorder.events), len(list(easy.get_empty_cells())))
+        for kind, (i, j), value, strategy in recorder.events:
+            self.assertEqual(solved.puzzle[i][j], value)
+            self.assertIn(strategy, ("find_single_missing", "find_exclude_in_zone"))
+
+    def test_search_events(self):
+        recorder = self.Recorder()
+        hard = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        hard.solve(engine="search", observer=recorder)
+        kinds = set(event[0] for event in recorder.events)
+        self.assertEqual(kinds, {"placement", "hypothesis", "contradiction"})
+
+    def test_silent_solve_does_not_log(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        with self.assertNoLogs(sudoku.logger, level="DEBUG"):
+            easy.solve(silent=True)
+        with self.assertLogs(sudoku.logger, level="DEBUG"):
+            easy.solve()
+
+
+class BenchTestCase(unittest.TestCase):
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "easy.txt"), "w") as file:
+                file.write(BatchTestCase.easy_line + "\n")
+            results = bench.run(engines=("search", "dlx"), tiers=("easy",), directory=directory)
+        self.assertEqual(set(results), {"search/easy", "dlx/easy"})
+        self.assertEqual(results["dlx/easy"]["solve_rate"], 1.0)
+        self.assertEqual(bench.compare(results, results), [])
+        slower = {key: dict(value, puzzles_per_sec=value["puzzles_per_sec"] / 2, solve_rate=0.5)
+                  for key, value in results.items()}
+        self.assertEqual(len(bench.compare(slower, results)), 4)
+        self.assertEqual(bench.compare(slower, results, threshold=0.6)[0][:14], "dlx/easy: solv")
+        self.assertEqual(results["dlx/easy"]["repeat"], bench.REPEAT)
+        jittery = {key: dict(value, p99_ms=value["p99_ms"] * 2) for key, value in results.items()}
+        self.assertEqual(bench.compare(jittery, results), [])
+        large = {key: dict(value, puzzles=bench.MIN_P99_SAMPLES) for key, value in jittery.items()}
+        self.assertEqual(len(bench.compare(large, results)), 2)
+
+    def test_percentile(self):
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(latency.percentile(values, 0.5), 3)
+        self.assertEqual(latency.percentile(values, 0.99), 5)
+        self.assertEqual(latency.percentile([7], 0.5), 7)
+
+    def test_bundled_corpora(self):
+        for tier in bench.TIERS:
+            lines = bench.load_corpus(tier)
+            self.assertTrue(lines)
+            for line in lines:
+                self.assertEqual(len(line), 81)
+
+
+class StatsTestCase(unittest.TestCase):
+    def test_propagation_stats(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        stats = easy.solve(silent=True).stats
+        self.assertEqual(stats.rounds, 1)
+        self.assertEqual(stats.nodes, 0)
+        placed = sum(s.placed for s in stats.strategies.values())
+        self.assertEqual(placed, len(list(easy.get_empty_cells())))
+        self.assertGreater(stats.strategies["find_single_missing"].calls, 0)
+        self.assertGreater(stats.strategies["find_single_missing"].eliminated, 0)
+        self.assertGreaterEqual(stats.time, stats.propagation_time())
+
+    def test_nishio_stats(self):
+        medium = sudoku.SudokuPuzzle.from_line(bench.load_corpus("medium")[0])
+        solved = medium.solve(silent=True)
+        self.assertTrue(solved.is_finished())
+        stats = solved.stats
+        self.assertGreater(stats.rounds, 1)
+        self.assertGreater(stats.strategies["nishio"].calls, 0)
+        self.assertGreater(stats.nodes, 0)
+        self.assertEqual(stats.max_depth, 1)
+
+    def test_placements_add_up(self):
+        for line in bench.load_corpus("medium"):
+            medium = sudoku.SudokuPuzzle.from_line(line)
+            solved = medium.solve(silent=True)
+            self.assertTrue(solved.is_finished())
+            self.assertEqual(sum(s.placed for s in solved.stats.strategies.values()), medium.values.count(0), line)
+
+    def test_nishio_nogoods(self):
+        class Eliminations(sudoku.Observer):
+            def __init__(self):
+                self.events = []
+
+            def elimination(self, cell, values, strategy):
+                if strategy == "nishio":
+                    self.events.append((cell, values))
+
+        # nishio gets stuck here unless refuted hypotheses are removed from candidates
+        hard = sudoku.SudokuPuzzle.from_line(
+            ".2.4.37.........32........4.4.2...7.8...5.........1...5.....9...3.9....7..1..86..")
+        observer = Eliminations()
+        solved = hard.solve(observer=observer)
+        self.assertEqual(solved.status, "solved")
+        self.assertGreater(len(observer.events), 0)
+        for (i, j), values in observer.events:
+            self.assertNotIn(solved.puzzle[i][j], values)
+
+    def test_search_stats(self):
+        hard = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        stats = hard.solve(silent=True, engine="search").stats
+        self.assertEqual(stats.strategies["search"].calls, stats.nodes)
+        self.assertGreater(stats.backtracks, 0)
+        self.assertGreater(stats.max_depth, 1)
+        self.assertEqual(set(stats.as_dict()["strategies"]),
+                         set(sudoku.PROPAGATION_STRATEGIES) | {"search"})
+
+    def test_no_stats(self):
+        easy = sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)
+        self.assertIsNone(easy.solve(silent=True, stats=False).stats)
+
+
+class GeneratorTestCase(unittest.TestCase):
+    def test_rate(self):
+        self.assertEqual(generator.rate(sudoku.SudokuPuzzle(sample.easy["puzzle"], sample.acceptable_values)),
+                         "singles")
+        self.assertEqual(generator.rate(sudoku.SudokuPuzzle(sample.medium["puzzle"], sample.acceptable_values)),
+                         "zones")
+        self.assertEqual(generator.rate(sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)),
+                         "search")
+
+    def test_seed(self):
+        self.assertEqual(generator.generate(7).to_line(), generator.generate(7).to_line())
+        self.assertNotEqual(generator.generate(7).to_line(), generator.generate(8).to_line())
+
+    def test_unique(self):
+        for su in generator.generate_many(3, seed=1):
+            self.assertTrue(su.is_unique())
+
+    def test_clues_and_difficulty(self):
+        for difficulty in ("singles", "zones", "nishio"):
+            su = generator.generate(3, clues=(26, 34), difficulty=difficulty)
+            self.assertTrue(su.is_unique())
+            self.assertEqual(generator.rate(su), difficulty)
+            self.assertIn(su.values.count(0), range(81 - 34, 81 - 26 + 1))
+
+    def test_unknown_difficulty(self):
+        with self.assertRaises(ValueError):
+            generator.generate(difficulty="fiendish")
+
+
+class CacheTestCase(unittest.TestCase):
+    hard_line = "".join("".join(row) for row in sample.hard["puzzle"]).replace("X", ".")
+
+    @staticmethod
+    def transform(line):
+        """
+        Transposes the grid, swaps first two bands, reverses rows in the last band
+        and relabels digits
+        """
+        rows = [line[r::9] for r in range(9)]
+        rows = rows[3:6] + rows[0:3] + rows[8:5:-1]
+        return "".join(rows).translate(str.maketrans("123456789", "953186274"))
+
+    def assertSolves(self, line, solved):
+        self.assertTrue(solved.is_finished())
+        for given, value in zip(line, solved.to_line()):
+            self.assertIn(given, (".", value))
+        for unit in solved.geometry.units:
+            self.assertEqual(len({solved.values[k] for k in unit}), 9)
+
+    def test_canonical_form(self):
+        line = self.transform(self.hard_line)
+        self.assertNotEqual(line, self.hard_line)
+        key, _ = cache.canonical_form(sudoku.SudokuPuzzle.from_line(self.hard_line))
+        self.assertEqual(cache.canonical_form(sudoku.SudokuPuzzle.from_line(line))[0], key)
+        self.assertEqual(key.count("."), self.hard_line.count("."))
+
+    def test_hit_is_mapped_back(self):
+        solutions = cache.SolutionCache()
+        line = self.transform(self.hard_line)
+        solved = solutions.solve(sudoku.SudokuPuzzle.from_line(self.hard_line), silent=True)
+        self.assertSolves(self.hard_line, solved)
+        self.assertEqual(solved.status, "solved")
+        solved = solutions.solve(sudoku.SudokuPuzzle.from_line(line), silent=True)
+        self.assertSolves(line, solved)
+        self.assertEqual(solved.status, "solved")
+        self.assertEqual(solved.stats.strategy("cache").calls, 1)
+        self.assertEqual(solutions.info()["hits"], 1)
+        self.assertEqual(solutions.info()["misses"], 1)
+
+    def test_limit_status(self):
+        solutions = cache.SolutionCache()
+        partial = solutions.solve(sudoku.SudokuPuzzle.from_line(self.hard_line), silent=True, max_nodes=3)
+        self.assertEqual(partial.status, "node_limit")
+        self.assertFalse(partial.is_finished())
+        stuck = solutions.solve(sudoku.SudokuPuzzle.from_line(self.hard_line), engine="strategies",
+                                enable_desperate=False, silent=True)
+        self.assertEqual(stuck.status, "unsolved")
+        self.assertEqual(solutions.info()["size"], 0)
+
+    def test_no_solution_is_cached(self):
+        solutions = cache.SolutionCache()
+        for _ in range(2):
+            with self.assertRaises(sudoku.NoSolutionException):
+                solutions.solve(sudoku.SudokuPuzzle.from_line("12345678." + "." * 8 + "9" + "." * 63), silent=True)
+        self.assertEqual((solutions.hits, solutions.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        solutions = cache.SolutionCache(maxsize=1)
+        easy = BatchTestCase.easy_line.replace("X", ".")
+        solutions.solve(sudoku.SudokuPuzzle.from_line(easy), silent=True)
+        solutions.solve(sudoku.SudokuPuzzle.from_line(self.hard_line), silent=True)
+        solutions.solve(sudoku.SudokuPuzzle.from_line(easy), silent=True)
+        self.assertEqual(solutions.info(), {"hits": 0, "disk_hits": 0, "misses": 3, "size": 1, "maxsize": 1})
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "solutions")
+            with cache.SolutionCache(path=path) as solutions:
+                solutions.solve(sudoku.SudokuPuzzle.from_line(self.hard_line), silent=True)
+            with cache.SolutionCache(path=path) as solutions:
+                line = self.transform(self.hard_line)
+                self.assertSolves(line, solutions.solve(sudoku.SudokuPuzzle.from_line(line), silent=True))
+                self.assertEqual((solutions.disk_hits, solutions.misses), (1, 0))
+
+
+class ServerTestCase(unittest.TestCase):
+    easy_line = "".join("".join(row) for row in sample.easy["puzzle"]).replace("X", ".")
+
+    def exchange(self, requests, unix=False, **kwargs):
+        """
+        Starts a server, sends requests over one connection and returns responses by id
+        """
+        async def run():
+            solve_server = server.SolveServer(workers=1, **kwargs)
+            with tempfile.TemporaryDirectory() as directory:
+                if unix:
+                    path = os.path.join(directory, "sudoku.sock")
+                    await solve_server.start_unix(path)
+                    reader, writer = await asyncio.open_unix_connection(path)
+                else:
+                    await solve_server.start()
+                    reader, writer = await asyncio.open_connection(*solve_server.address)
+                for request in requests:
+                    writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b"\n")
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in requests]
+                writer.close()
+                await solve_server.close()
+            return {response["id"]: response for response in responses}
+        return asyncio.run(run())
+
+    def test_solve(self):
+        responses = self.exchange([{"id": 1, "puzzle": self.easy_line},
+                                   {"id": 2, "puzzle": "12345678." + "." * 8 + "9" + "." * 63, "engine": "dlx"},
+                                   {"id": 3, "op": "metrics"}])
+        self.assertEqual(responses[1]["solution"], BatchTestCase.easy_solution)
+        self.assertEqual(responses[2]["error"], "no_solution")
+        self.assertIn("in_flight", responses[3]["metrics"])
+
+    def test_bad_requests(self):
+        responses = self.exchange(["not json", {"id": 1, "puzzle": "123"}, {"id": 2, "puzzle": 5},
+                                   {"id": 3, "op": "dance"}])
+        self.assertEqual(responses[None]["error"], "bad_request")
+        for i in (1, 2, 3):
+            self.assertEqual(responses[i]["error"], "bad_request")
+
+    def test_line_too_long(self):
+        responses = self.exchange([{"id": 1, "puzzle": self.easy_line}, "x" * 70000,
+                                   {"id": 2, "puzzle": self.easy_line}])
+        self.assertEqual(responses[None]["error"], "bad_request")
+        self.assertEqual(responses[1]["solution"], BatchTestCase.easy_solution)
+        self.assertEqual(responses[2]["solution"], BatchTestCase.easy_solution)
+
+    def test_overloaded(self):
+        responses = self.exchange([{"id": 1, "puzzle": self.easy_line}], max_in_flight=0)
+        self.assertEqual(responses[1]["error"], "overloaded")
+
+    def test_timeout(self):
+        responses = self.exchange([{"id": 1, "puzzle": self.easy_line}, {"id": 2, "op": "metrics"}], timeout=0)
+        self.assertEqual(responses[1]["error"], "timeout")
+
+    def test_unix_socket(self):
+        responses = self.exchange([{"id": 1, "puzzle": self.easy_line}], unix=True)
+        self.assertEqual(responses[1]["solution"], BatchTestCase.easy_solution)
+
+
+class DeductionsTestCase(unittest.TestCase):
+    advanced = "....2..19..7..4...61.7.....1.......2....98..13.8.4...7..6.32...7...6.2..5...7..3."
+
+    def setUp(self):
+        self.su = sudoku.SudokuPuzzle.from_line("." * 81)
+
+    def keep(self, k, values):
+        """
+        Leaves only given candidates in cell k
+        """
+        mask = sum(self.su.bits[value] for value in values)
+        self.su.eliminate(k, self.su.full_mask & ~mask)
+
+    def remove(self, value, cells):
+        for k in cells:
+            self.su.eliminate(k, self.su.bits[value])
+
+    def test_naked_triple(self):
+        for k, values in ((0, "12"), (4, "23"), (8, "13")):
+            self.keep(k, values)
+        self.assertEqual(deductions.naked_subsets(self.su), 18)
+        self.assertEqual(self.su.get_candidates(0, 3), set("456789"))
+        self.assertEqual(self.su.get_candidates(1, 0), set("123456789"))
+
+    def test_hidden_pair(self):
+        self.remove("1", [1, 2, 3, 5, 6, 7, 8])
+        self.remove("2", [1, 2, 3, 5, 6, 7, 8])
+        self.assertEqual(deductions.hidden_subsets(self.su), 14)
+        self.assertEqual(self.su.get_candidates(0, 0), {"1", "2"})
+        self.assertEqual(self.su.get_candidates(0, 4), {"1", "2"})
+
+    def test_pointing(self):
+        self.remove("5", [9, 10, 11, 18, 19, 20])
+        self.assertEqual(deductions.locked_candidates(self.su), 6)
+        self.assertNotIn("5", self.su.get_candidates(0, 8))
+        self.assertIn("5", self.su.get_candidates(1, 8))
+
+    def test_x_wing(self):
+        self.remove("1", [c for c in range(9) if c not in (1, 7)])
+        self.remove("1", [45 + c for c in range(9) if c not in (1, 7)])
+        self.assertEqual(deductions.x_wing(self.su), 14)
+        self.assertNotIn("1", self.su.get_candidates(3, 7))
+        self.assertIn("1", self.su.get_candidates(5, 1))
+
+    def test_swordfish(self):
+        for row, columns in ((0, (0, 3)), (4, (3, 6)), (8, (0, 6))):
+            self.remove("1", [row * 9 + c for c in range(9) if c not in columns])
+        self.assertEqual(deductions.x_wing(self.su), 0)
+        self.assertEqual(deductions.swordfish(self.su), 18)
+        self.assertNotIn("1", self.su.get_candidates(2, 6))
+        self.assertIn("1", self.su.get_candidates(2, 5))
+
+    def test_xy_wing(self):
+        for k, values in ((0, "12"), (5, "13"), (45, "23")):
+            self.keep(k, values)
+        self.assertEqual(deductions.xy_wing(self.su), 1)
+        self.assertNotIn("3", self.su.get_candidates(5, 5))
+
+    def test_pipeline(self):
+        su = sudoku.SudokuPuzzle.from_line(self.advanced)
+        self.assertFalse(su.solve(silent=True, enable_desperate=False, pipeline=()).is_finished())
+        solved = su.solve(silent=True, enable_desperate=False)
+        self.assertTrue(solved.is_finished())
+        self.assertEqual(solved, su.solve(silent=True, engine="search"))
+        self.assertGreater(sum(solved.stats.strategies[strategy.__name__].eliminated
+                               for strategy in deductions.PIPELINE), 0)
+        self.assertEqual(generator.rate(su), "advanced")
+
+    def test_search_pipeline(self):
+        su = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        plain = su.solve(silent=True, engine="search")
+        deduced = su.solve(silent=True, engine="search", pipeline=deductions.PIPELINE)
+        self.assertEqual(plain, deduced)
+        self.assertLessEqual(deduced.stats.nodes, plain.stats.nodes)
+
+
+class SessionTestCase(unittest.TestCase):
+    line = "....2..19..7..4...61.7.....1.......2....98..13.8.4...7..6.32...7...6.2..5...7..3."
+
+    def setUp(self):
+        self.session = session.Session(self.line)
+        self.solution = self.session.solution.to_line()
+
+    def value(self, row, column):
+        return self.solution[row * 9 + column]
+
+    def test_check(self):
+        self.assertEqual(self.session.check(0, 4, "5"), "given")
+        self.assertEqual(self.session.check(0, 0, self.value(0, 0)), "ok")
+        self.assertEqual(self.session.check(0, 0, "2"), "conflict")
+        wrong = next(v for v in self.session.grid.get_candidates(0, 0) if v != self.value(0, 0))
+        self.assertEqual(self.session.check(0, 0, wrong), "wrong")
+        self.assertEqual(self.session.play(0, 0, wrong), "wrong")
+        self.assertEqual(self.session.check(0, 0, self.value(0, 0)), "filled")
+        self.assertEqual(self.session.mistakes(), [(0, 0)])
+        with self.assertRaises(ValueError):
+            self.session.check(9, 0, "1")
+
+    def test_undo_and_erase(self):
+        candidates = list(self.session.grid.candidates)
+        self.assertEqual(self.session.play(0, 0, self.value(0, 0)), "ok")
+        self.assertEqual(self.session.play(0, 1, self.value(0, 1)), "ok")
+        self.assertEqual(self.session.play(1, 0, self.value(1, 0)), "ok")
+        self.assertTrue(self.session.erase(0, 0))
+        self.assertFalse(self.session.erase(0, 0))
+        replayed = session.Session(self.line)
+        replayed.play(0, 1, self.value(0, 1))
+        replayed.play(1, 0, self.value(1, 0))
+        self.assertEqual(self.session.grid.candidates, replayed.grid.candidates)
+        self.assertEqual(self.session.grid.to_line(), replayed.grid.to_line())
+        self.assertEqual(self.session.undo(), (1, 0))
+        self.assertEqual(self.session.undo(), (0, 1))
+        self.assertIsNone(self.session.undo())
+        self.assertEqual(list(self.session.grid.candidates), candidates)
+
+    def follow_hints(self, game):
+        strategies = set()
+        while not game.is_finished():
+            hint = game.next_hint()
+            strategies.add(hint.strategy)
+            if hint.value is None:
+                self.assertEqual(game.eliminate(*hint.cell, hint.eliminated), "ok")
+            else:
+                self.assertEqual(game.play(*hint.cell, hint.value), "ok")
+        self.assertEqual(game.grid.to_line(), game.solution.to_line())
+        self.assertIsNone(game.next_hint())
+        return strategies
+
+    def test_hints_solve(self):
+        strategies = self.follow_hints(self.session)
+        self.assertTrue({"find_single_missing", "find_exclude_in_zone"} <= strategies)
+        self.assertTrue(strategies & {strategy.__name__ for strategy in deductions.PIPELINE})
+
+    def test_hints_solve_hard(self):
+        strategies = self.follow_hints(session.Session(bench.load_corpus("hard")[0]))
+        self.assertIn("locked_candidates", strategies)
+
+    def test_eliminate(self):
+        candidates = list(self.session.grid.candidates)
+        wrong = sorted(v for v in self.session.grid.get_candidates(0, 0) if v != self.value(0, 0))
+        self.assertEqual(self.session.eliminate(0, 4, ["1"]), "given")
+        self.assertEqual(self.session.eliminate(0, 0, wrong + [self.value(0, 0)]), "contradiction")
+        self.assertEqual(self.session.eliminate(0, 0, [self.value(0, 0)]), "wrong")
+        self.assertEqual(self.session.mistakes(), [(0, 0)])
+        self.assertEqual(self.session.next_hint().strategy, "mistake")
+        self.assertEqual(self.session.undo(), (0, 0))
+        self.assertEqual(self.session.eliminate(0, 0, wrong[:1]), "ok")
+        self.assertEqual(self.session.play(0, 1, self.value(0, 1)), "ok")
+        self.assertNotIn(wrong[0], self.session.grid.get_candidates(0, 0))
+        self.assertTrue(self.session.erase(0, 0))
+        self.assertIn(wrong[0], self.session.grid.get_candidates(0, 0))
+        self.assertEqual(self.session.grid.to_line()[1], self.value(0, 1))
+        self.assertEqual(self.session.undo(), (0, 1))
+        self.assertEqual(list(self.session.grid.candidates), candidates)
+
+    def test_mistake_hint(self):
+        wrong = next(v for v in self.session.grid.get_candidates(0, 0) if v != self.value(0, 0))
+        self.session.play(0, 0, wrong)
+        hint = self.session.next_hint()
+        self.assertEqual((hint.strategy, hint.cell, hint.value), ("mistake", (0, 0), self.value(0, 0)))
+
+    def test_no_solution(self):
+        with self.assertRaises(sudoku.NoSolutionException):
+            session.Session("12345678.........9" + "." * 63)
+
+
+class ParallelTestCase(unittest.TestCase):
+    def test_split_is_disjoint(self):
+        su = sudoku.SudokuPuzzle.from_line("." * 81)
+        tasks, solved = parallel.split(su, 8)
+        self.assertGreaterEqual(len(tasks), 8)
+        self.assertEqual(solved, [])
+        self.assertEqual(su.values.count(0), 81)
+        lines = set(task.to_line() for task in tasks)
+        self.assertEqual(len(lines), len(tasks))
+        medium = sudoku.SudokuPuzzle.from_line(bench.load_corpus("medium")[0])
+        tasks, solved = parallel.split(medium, 8)
+        self.assertEqual(sum(sudoku.count_solutions(task) for task in tasks) + len(solved), 1)
+
+    def test_solve(self):
+        for line in bench.load_corpus("hard")[:3]:
+            su = sudoku.SudokuPuzzle.from_line(line)
+            solved = parallel.solve(su, workers=2)
+            self.assertEqual(solved.status, "solved")
+            self.assertEqual(solved, su.solve(silent=True, engine="search"))
+        with self.assertRaises(sudoku.NoSolutionException):
+            parallel.solve(sudoku.SudokuPuzzle.from_line(bench.load_corpus("pathological")[-1]), workers=2)
+
+    def test_count(self):
+        su = sudoku.SudokuPuzzle(sample.hard["puzzle"], sample.acceptable_values)
+        self.assertTrue(parallel.is_unique(su, workers=2))
+        empty = sudoku.SudokuPuzzle.from_line("." * 81)
+        self.assertFalse(parallel.is_unique(empty, workers=2))
+        self.assertEqual(parallel.count(empty, limit=50, workers=2), 50)
+        few = sudoku.SudokuPuzzle.from_line(
+            "......8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......")
+        self.assertEqual(parallel.count(few, limit=300, workers=2), few.count_solutions(limit=300))
+
+    def test_deadline(self):
+        su = sudoku.SudokuPuzzle.from_line(LargeBoardTestCase.line16)
+        result = parallel.solve(su, workers=2, deadline=time.monotonic())
+        self.assertIn(result.status, ("solved", "timeout"))
+        with self.assertRaises(sudoku.LimitReached):
+            parallel.count(sudoku.SudokuPuzzle.from_line("." * 81), workers=2, deadline=time.monotonic())
+
+
+class CliTestCase(unittest.TestCase):
+    lines = ["..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..",
+             "12345678.........9" + "." * 63,
+             "abc"]
+
+    def run_main(self, *args, stdin=""):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), unittest.mock.patch("sys.stdin", io.StringIO(stdin)):
+            code = sudoku.main(list(args))
+        return code, out.getvalue()
+
+    def test_text(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "puzzles.txt")
+            with open(path, "w") as file:
+                file.write("# puzzles\n" + self.lines[0] + "\n\n")
+            code, out = self.run_main(path)
+        self.assertEqual(code, 0)
+        self.assertEqual(out, sudoku.SudokuPuzzle.from_line(self.lines[0]).solve(silent=True).to_line() + " solved\n")
+
+    def test_jsonl_from_stdin(self):
+        code, out = self.run_main("--format=jsonl", "--engine", "dlx", stdin="\n".join(self.lines))
+        self.assertEqual(code, 1)
+        records = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual([record["status"] for record in records], ["solved", "no_solution", "invalid"])
+        self.assertEqual(records[0]["puzzle"], self.lines[0])
+        self.assertTrue(sudoku.SudokuPuzzle.from_line(records[0]["solution"]).is_finished())
+        self.assertNotIn("solution", records[1])
+
+    def test_html(self):
+        code, out = self.run_main("--format", "html", "-", stdin="\n".join(self.lines))
+        self.assertEqual(out.count("<html>"), 1)
+        self.assertEqual(out.count("<table>"), 1)
+        self.assertTrue(out.rstrip().endswith("</html>"))
+        self.assertIn("<p>invalid: abc</p>", out)
+
+    def test_parse_args(self):
+        argv = ["--format", "jsonl", "a.txt", "-", "--timeout=2.5", "--verbose", "--engine=strategies"]
+        self.assertEqual(vars(sudoku.parse_args(argv)), vars(sudoku.argument_parser().parse_args(argv)))
+        self.assertEqual(vars(sudoku.parse_args([])), vars(sudoku.argument_parser().parse_args([])))
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            sudoku.parse_args(["--format", "xml"])
+
+    def test_light_import(self):
+        code = "import sys, sudoku; print(' '.join(m for m in ('argparse', 'dlx', 'htmltable', 'json', " \
+               "'logging', 'sample') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), "")
+
+
 class StrategyTestCase(unittest.TestCase):
     def test_locked_candidates(self):
         puzzle = [
@@ -0,0 +1,162 @@
+"""
+NumPy batch engine: runs singles over many puzzles at once.
+
+N puzzles are kept as (N, size, size) array of digit numbers (0 for empty cells)
+and (N, cells, size) boolean candidate tensor. Naked singles (as in ``find_single_missing``)
+and hidden singles (as in ``find_exclude_in_zone``) are applied to all puzzles with array
+operations until nothing changes; only puzzles left unsolved go to per-puzzle search.
+
+Requires numpy.
+"""
+from itertools import islice
+import numpy as np
+from batch import read_lines, solve_line
+from sudoku import EMPTY, default_symbols, get_geometry
+
+
+class Tables:
+    """
+    Geometry tables as arrays
+    """
+    def __init__(self, size):
+        geometry = get_geometry(size)
+        self.size = size
+        self.units = np.array(geometry.units, dtype=np.intp)
+        self.cell_units = np.array(geometry.cell_units, dtype=np.intp)
+
+
+def encode(lines, acceptable_values=None):
+    """
+    Converts puzzle lines to (N, size, size) array, values are 1-based indexes of sorted symbols.
+    Only one character per cell lines are supported.
+    :raises ValueError: lines of different length or with unknown symbols, see ``SudokuPuzzle.from_line``
+    """
+    n_cells = len(lines[0])
+    size = int(round(n_cells ** 0.5))
+    symbols = sorted(acceptable_values or default_symbols(size))
+    lookup = np.full(256, -1, dtype=np.int8)
+    for value in EMPTY:
+        lookup[ord(value)] = 0
+    for i, value in enumerate(symbols):
+        lookup[ord(value)] = i + 1
+    for line in lines:
+        if len(line) != n_cells:
+            raise ValueError("Lines of different length in batch: {!r}".format(line))
+    try:
+        raw = np.frombuffer("".join(lines).encode("latin-1"), dtype=np.uint8)
+    except UnicodeEncodeError as x:
+        raise ValueError("Not a one character per cell line: {}".format(x))
+    grid = lookup[raw]
+    if (grid < 0).any():
+        k = int(np.argmax(grid < 0))
+        raise ValueError("Unknown symbol {!r} in {!r}".format(chr(raw[k]), lines[k // n_cells]))
+    return grid.reshape(len(lines), size, size)
+
+
+def decode(grid, acceptable_values=None, empty="."):
+    """
+    Converts (N, size, size) array back to puzzle lines
+    """
+    symbols = sorted(acceptable_values or default_symbols(grid.shape[1]))
+    lookup = np.frombuffer((empty + "".join(symbols)).encode("latin-1"), dtype=np.uint8)
+    n_cells = grid.shape[1] * grid.shape[2]
+    text = lookup[grid.reshape(len(grid), -1)].tobytes().decode("latin-1")
+    return [text[i:i + n_cells] for i in range(0, len(text), n_cells)]
+
+
+def get_candidates(cells, tables):
+    """
+    :param cells: (N, cells) array of values
+    :return: (N, cells, size) candidate tensor, (N, units, size) digits present in units
+    """
+    size = tables.size
+    one_hot = cells[:, :, None] == np.arange(1, size + 1, dtype=cells.dtype)
+    present = one_hot[:, tables.units, :].any(axis=2)
+    blocked = present[:, tables.cell_units, :].any(axis=2)
+    return ~blocked & (cells == 0)[:, :, None], present
+
+
+def run_singles(grid, tables):
+    """
+    Fills naked and hidden singles in all puzzles in place
+    :return: boolean arrays (solved, contradiction) per puzzle
+    """
+    n = len(grid)
+    size = tables.size
+    cells = grid.reshape(n, -1)
+    active = np.arange(n)
+    solved = np.zeros(n, dtype=bool)
+    contradiction = np.zeros(n, dtype=bool)
+    while active.size:
+        sub = cells[active]
+        candidates, present = get_candidates(sub, tables)
+        empty = sub == 0
+        n_candidates = candidates.sum(axis=2)
+        # a digit that is placed twice in a unit, an empty cell without candidates,
+        # or a missing digit without a place in its unit
+        unit_candidates = candidates[:, tables.units, :]
+        unit_counts = unit_candidates.sum(axis=2)
+        placed_counts = (sub[:, tables.units][:, :, :, None] == np.arange(1, size + 1)).sum(axis=2)
+        broken = ((placed_counts > 1).any(axis=(1, 2))
+                  | (empty & (n_candidates == 0)).any(axis=1)
+                  | ((unit_counts == 0) & ~present).any(axis=(1, 2)))
+        done = ~empty.any(axis=1) & ~broken
+        solved[active[done]] = True
+        contradiction[active[broken]] = True
+        keep = ~done & ~broken
+        # find_single_missing: cells with one candidate
+        naked = empty & (n_candidates == 1)
+        new_values = np.where(naked, candidates.argmax(axis=2) + 1, 0)
+        # find_exclude_in_zone: digits with one place in a unit
+        hidden = (unit_counts == 1) & keep[:, None, None]
+        puzzle_i, unit_i, digit_i = np.nonzero(hidden)
+        cell_i = tables.units[unit_i, unit_candidates[puzzle_i, unit_i, :, digit_i].argmax(axis=1)]
+        new_values[puzzle_i, cell_i] = digit_i + 1
+        new_values[~keep] = 0
+        progress = (new_values != 0).any(axis=1)
+        cells[active] = np.where(new_values != 0, new_values, sub).astype(cells.dtype)
+        active = active[keep & progress]
+    return solved, contradiction
+
+
+def solve_batch(lines, engine="search", acceptable_values=None):
+    """
+    Solves list of puzzle lines of the same size
+    :param engine: engine for puzzles not solved by singles, see ``SudokuPuzzle.solve``
+    :return: list of solution lines (None for invalid lines, puzzles without solution
+        or not solved by the engine)
+    """
+    try:
+        grid = encode(lines, acceptable_values)
+    except ValueError:
+        # a batch with invalid lines is solved line by line, which gives None for those
+        return [solve_line(line, engine, acceptable_values) for line in lines]
+    return solve_grid(grid, engine, acceptable_values)
+
+
+def solve_grid(grid, engine="search", acceptable_values=None):
+    """
+    Same as ``solve_batch`` for (N, size, size) array of values, e.g. ``packed.PackedReader.array``;
+    the array is not changed
+    """
+    original = grid
+    grid = grid.copy()
+    solved, contradiction = run_singles(grid, Tables(grid.shape[1]))
+    results = decode(grid, acceptable_values)
+    for i in np.nonzero(~solved)[0]:
+        # contradictions may come from two singles placed in one step, so the original is re-checked
+        line = decode(original[i:i + 1], acceptable_values)[0] if contradiction[i] else results[i]
+        results[i] = solve_line(line, engine, acceptable_values)
+    return results
+
+
+def solve_many(source, engine="search", batch_size=4096, acceptable_values=None):
+    """
+    Same as ``batch.solve_many``, but solves ``batch_size`` puzzles at a time with ``solve_batch``
+    """
+    lines = read_lines(source)
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            return
+        yield from solve_batch(chunk, engine, acceptable_values)